@@ -0,0 +1,163 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+from bokeh.embed import file_html, json_item
+from bokeh.resources import CDN
+from LinePlots import LinePlots
+from ScatterPlots import ScatterPlots
+from StatisticsPlots import StatisticsPlots
+from PicturePlots import PicturePlots
+
+
+def render_plot(
+    plot_class: type,
+    init_kwargs: dict,
+    method_name: str,
+    args: tuple,
+    kwargs: dict,
+    output_format: str = "json",
+):
+    """[Builds a plot without showing it and returns the serialized document. Errors of the
+    'generate_*' method are raised (not printed), so a failed plot never comes back as an empty
+    document. Kept at module level so that it can also be sent to a 'ProcessPoolExecutor']
+
+    Arguments:
+        plot_class {type} -- [LinePlots/ScatterPlots/StatisticsPlots/PicturePlots]
+        init_kwargs {dict} -- [Keyword arguments for the constructor of 'plot_class']
+        method_name {str} -- [Name of the 'generate_*' method to call]
+        args {tuple} -- [Positional arguments of the 'generate_*' method]
+        kwargs {dict} -- [Keyword arguments of the 'generate_*' method]
+
+    Keyword Arguments:
+        output_format {str} -- ["json" for 'json_item' output, "html" for a standalone HTML
+        document] (default: {"json"})
+
+    Returns:
+        [dict/str] -- [Output of 'json_item' or 'file_html']
+    """
+    if output_format not in ("json", "html"):
+        raise ValueError("output_format must be 'json' or 'html'")
+    plot = plot_class(**init_kwargs)
+    plot.auto_show = False
+    plot.raise_errors = True
+    getattr(plot, method_name)(*args, **kwargs)
+    if output_format == "json":
+        return json_item(plot.figure)
+    return file_html(
+        plot.figure, CDN, title=init_kwargs.get("plot_title", kwargs.get("plot_title"))
+    )
+
+
+class AsyncPlots:
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = 4,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """[Asyncio facade over the plot classes. Filtering, source building and serialization
+        run in an executor, so the event loop is never blocked by a 'generate_*' call]
+
+        Keyword Arguments:
+            executor {Executor} -- [Executor running the plots. If None, a private
+            'ThreadPoolExecutor' with 'max_concurrency' workers is created] (default: {None})
+            max_concurrency {int} -- [Maximum number of plots being built at the same time,
+            further requests wait for a free slot] (default: {4})
+            timeout {float} -- [Default time limit (seconds) of one request; None means no
+            limit] (default: {None})
+        """
+        self._owns_executor = executor is None
+        self.executor = (
+            ThreadPoolExecutor(max_workers=max_concurrency) if executor is None else executor
+        )
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(
+        self,
+        plot_class: type,
+        method_name: str,
+        *args,
+        init_kwargs: Optional[dict] = None,
+        output_format: str = "json",
+        timeout: Optional[float] = None,
+        **kwargs,
+    ):
+        """[Runs 'plot_class(**init_kwargs).<method_name>(*args, **kwargs)' in the executor and
+        returns the serialized document. The timeout covers the wait for a free slot as well as
+        the plot itself. Cancelling the awaiting task (or hitting the timeout) drops the job if it has not started yet; a job already running in a thread cannot be
+        stopped, it finishes in the background (its result is discarded) and keeps its
+        concurrency slot until then, so 'max_concurrency' always bounds the running jobs]
+
+        Arguments:
+            plot_class {type} -- [LinePlots/ScatterPlots/StatisticsPlots/PicturePlots]
+            method_name {str} -- [Name of the 'generate_*' method, e.g. "generate_scatter_plot"]
+
+        Keyword Arguments:
+            init_kwargs {dict} -- [Keyword arguments for the constructor] (default: {None})
+            output_format {str} -- ["json" or "html"] (default: {"json"})
+            timeout {float} -- [Time limit (seconds) for this request, overrides the default
+            one] (default: {None})
+
+        Returns:
+            [dict/str] -- [Output of 'json_item' or 'file_html']
+        """
+        job = partial(
+            render_plot,
+            plot_class,
+            init_kwargs or {},
+            method_name,
+            args,
+            kwargs,
+            output_format,
+        )
+        loop = asyncio.get_running_loop()
+
+        def release(_) -> None:
+            # Runs in the worker thread once the job is done (or in the loop if it is dropped)
+            try:
+                loop.call_soon_threadsafe(self._semaphore.release)
+            except RuntimeError:
+                # The loop is closed, nothing waits for the slot anymore
+                pass
+
+        async def run():
+            await self._semaphore.acquire()
+            try:
+                future = self.executor.submit(job)
+            except BaseException:
+                self._semaphore.release()
+                raise
+            # The slot is freed when the job ends, not when the awaiting task gives up on it
+            future.add_done_callback(release)
+            return await asyncio.wrap_future(future)
+
+        return await asyncio.wait_for(run(), timeout if timeout is not None else self.timeout)
+
+    async def generate_line_plot(self, method_name: str, *args, **kwargs):
+        """[Async variant of the 'LinePlots' methods, see 'generate']"""
+        return await self.generate(LinePlots, method_name, *args, **kwargs)
+
+    async def generate_scatter_plot(self, method_name: str, *args, **kwargs):
+        """[Async variant of the 'ScatterPlots' methods, see 'generate']"""
+        return await self.generate(ScatterPlots, method_name, *args, **kwargs)
+
+    async def generate_statistics_plot(self, method_name: str, *args, **kwargs):
+        """[Async variant of the 'StatisticsPlots' methods, see 'generate']"""
+        return await self.generate(StatisticsPlots, method_name, *args, **kwargs)
+
+    async def generate_picture_plot(self, *args, **kwargs):
+        """[Async variant of 'PicturePlots.generate_picture_plot', see 'generate']"""
+        return await self.generate(PicturePlots, "generate_picture_plot", *args, **kwargs)
+
+    def close(self) -> None:
+        """[Shuts down the executor, if it was created by this instance]"""
+        if self._owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "AsyncPlots":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,285 @@
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from bokeh.util.hex import cartesian_to_axial
+from DataSources import read_frame
+from Downsampling import to_numeric
+
+# Vectorized 2D binning for density plots. Inputs can be one table or a list/iterator of chunks
+# (e.g. pd.read_csv(..., chunksize=...)); counts are accumulated chunk by chunk, so the memory
+# needed is bounded by the number of bins and not by the number of observations.
+
+
+def is_chunked(data: Any) -> bool:
+    """[True for a list/tuple of tables or a one-shot iterator of tables]"""
+    return isinstance(data, (list, tuple)) or hasattr(data, "__next__")
+
+
+def iter_chunks(data: Any, columns: list) -> Iterator[pd.DataFrame]:
+    """[Yields the requested columns of every chunk, see 'DataSources.read_frame']"""
+    for chunk in data if is_chunked(data) else [data]:
+        yield read_frame(chunk, columns)
+
+
+def data_bounds(
+    data: Any, x_column: str, y_column: str
+) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    """[Smallest and largest x- and y-values of the data, in one pass over the chunks]
+
+    Arguments:
+        data {Any} -- [Table or list of tables (not a one-shot iterator)]
+        x_column {str} -- [Name of the x-value column]
+        y_column {str} -- [Name of the y-value column]
+
+    Returns:
+        Tuple[Tuple[float, float], Tuple[float, float]] -- [(x_min, x_max), (y_min, y_max)]
+    """
+    if hasattr(data, "__next__"):
+        raise ValueError("x_range and y_range are required for iterator input")
+    x_min = y_min = np.inf
+    x_max = y_max = -np.inf
+    for chunk in iter_chunks(data, [x_column, y_column]):
+        x, y = chunk[x_column].to_numpy(float), chunk[y_column].to_numpy(float)
+        x_min, x_max = min(x_min, np.nanmin(x)), max(x_max, np.nanmax(x))
+        y_min, y_max = min(y_min, np.nanmin(y)), max(y_max, np.nanmax(y))
+    return (x_min, x_max), (y_min, y_max)
+
+
+def histogram2d(
+    data: Any,
+    x_column: str,
+    y_column: str,
+    bins: Any = 100,
+    x_range: Optional[Tuple[float, float]] = None,
+    y_range: Optional[Tuple[float, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """[2D histogram of the data, accumulated with 'np.histogram2d' chunk by chunk]
+
+    Arguments:
+        data {Any} -- [Table or list/iterator of tables]
+        x_column {str} -- [Name of the x-value column]
+        y_column {str} -- [Name of the y-value column]
+
+    Keyword Arguments:
+        bins {int/Tuple[int, int]} -- [Number of bins (for both or each axis)] (default: {100})
+        x_range {Tuple[float, float]} -- [Binned x-range, data extent when None]
+        (default: {None})
+        y_range {Tuple[float, float]} -- [Binned y-range, data extent when None]
+        (default: {None})
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray] -- [Counts (x-bins, y-bins), x-edges, y-edges]
+    """
+    if x_range is None or y_range is None:
+        bounds = data_bounds(data, x_column, y_column)
+        x_range, y_range = x_range or bounds[0], y_range or bounds[1]
+    x_bins, y_bins = (bins, bins) if np.isscalar(bins) else bins
+    x_edges = np.linspace(x_range[0], x_range[1], x_bins + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], y_bins + 1)
+    counts = np.zeros((x_bins, y_bins))
+    for chunk in iter_chunks(data, [x_column, y_column]):
+        counts += np.histogram2d(
+            chunk[x_column].to_numpy(float),
+            chunk[y_column].to_numpy(float),
+            bins=[x_edges, y_edges],
+        )[0]
+    return counts, x_edges, y_edges
+
+
+def hexbin(
+    data: Any,
+    x_column: str,
+    y_column: str,
+    size: float,
+    aspect_scale: float = 1,
+    x_range: Optional[Tuple[float, float]] = None,
+    y_range: Optional[Tuple[float, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """[Counts per hexagon ("pointytop" tiling as drawn by Bokeh's 'hex_tile'). Points are mapped
+    to axial (q, r) coordinates and counted with one 'np.bincount' per chunk over a fixed grid]
+
+    Arguments:
+        data {Any} -- [Table or list/iterator of tables]
+        x_column {str} -- [Name of the x-value column]
+        y_column {str} -- [Name of the y-value column]
+        size {float} -- [Hexagon size (center to top corner) in y-units]
+
+    Keyword Arguments:
+        aspect_scale {float} -- [Horizontal scaling of the hexagons, see 'hex_tile'] (default: {1})
+        x_range {Tuple[float, float]} -- [Binned x-range, data extent when None]
+        (default: {None})
+        y_range {Tuple[float, float]} -- [Binned y-range, data extent when None]
+        (default: {None})
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray] -- [q, r and counts of the non-empty hexagons]
+    """
+    if x_range is None or y_range is None:
+        bounds = data_bounds(data, x_column, y_column)
+        x_range, y_range = x_range or bounds[0], y_range or bounds[1]
+    # Axial extent of the binned rectangle, from its corners plus one hexagon of margin
+    corner_q, corner_r = cartesian_to_axial(
+        np.array([x_range[0], x_range[0], x_range[1], x_range[1]]),
+        np.array([y_range[0], y_range[1], y_range[0], y_range[1]]),
+        size,
+        "pointytop",
+        aspect_scale,
+    )
+    q_min, r_min = corner_q.min() - 1, corner_r.min() - 1
+    n_q, n_r = corner_q.max() + 2 - q_min, corner_r.max() + 2 - r_min
+    counts = np.zeros(n_q * n_r, dtype=np.int64)
+    for chunk in iter_chunks(data, [x_column, y_column]):
+        x, y = chunk[x_column].to_numpy(float), chunk[y_column].to_numpy(float)
+        inside = (
+            (x >= x_range[0]) & (x <= x_range[1]) & (y >= y_range[0]) & (y <= y_range[1])
+        )
+        q, r = cartesian_to_axial(x[inside], y[inside], size, "pointytop", aspect_scale)
+        counts += np.bincount((q - q_min) * n_r + (r - r_min), minlength=len(counts))
+    cells = np.flatnonzero(counts)
+    return cells // n_r + q_min, cells % n_r + r_min, counts[cells]
+
+
+def rasterize_lines(
+    values: np.ndarray,
+    width: int,
+    height: int,
+    y_range: Tuple[float, float],
+    normalize: bool = False,
+    block_size: int = 4096,
+) -> np.ndarray:
+    """[Rasterizes curves sampled at x = 0, 1, ..., n_points - 1 into a hit-count grid. In every
+    pixel column a curve covers the rows between its lowest and highest value in that column
+    (the segment ends at the column edges and all vertices inside), so steep segments leave no
+    gaps. Spans are accumulated with a difference array and one cumulative sum]
+
+    Arguments:
+        values {np.ndarray} -- [Curves as rows, shape (n_curves, n_points)]
+        width {int} -- [Number of pixel columns, covering x = 0 to n_points - 1]
+        height {int} -- [Number of pixel rows, covering 'y_range']
+        y_range {Tuple[float, float]} -- [Lowest and highest y-value of the grid]
+
+    Keyword Arguments:
+        normalize {bool} -- [If True, every curve adds a total of 1 per pixel column (spread
+        over its span), so steep curves do not outweigh flat ones] (default: {False})
+        block_size {int} -- [Number of curves rasterized at once, bounds the memory]
+        (default: {4096})
+
+    Returns:
+        np.ndarray -- [Grid of shape (height, width), row 0 at the bottom]
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_points = values.shape[1]
+    # Column edges in x, and the vertices strictly inside every column
+    edges = np.linspace(0, n_points - 1, width + 1)
+    left = np.minimum(np.floor(edges).astype(np.int64), n_points - 2)
+    frac = edges - left
+    first_inside = np.floor(edges[:-1]).astype(np.int64) + 1
+    last_inside = np.ceil(edges[1:]).astype(np.int64) - 1
+    has_vertex = first_inside <= last_inside
+    starts = np.minimum(first_inside, n_points - 1)
+    y_scale = height / ((y_range[1] - y_range[0]) or 1.0)
+    columns = np.arange(width)
+    diff = np.zeros((height + 1) * width)
+    for block in range(0, len(values), block_size):
+        curves = values[block : block + block_size]
+        at_edges = curves[:, left] * (1 - frac) + curves[:, left + 1] * frac
+        low = np.fmin(at_edges[:, :-1], at_edges[:, 1:])
+        high = np.fmax(at_edges[:, :-1], at_edges[:, 1:])
+        if has_vertex.any():
+            inner = has_vertex.nonzero()[0]
+            low[:, inner] = np.fmin(
+                low[:, inner], np.fmin.reduceat(curves, starts, axis=1)[:, inner]
+            )
+            high[:, inner] = np.fmax(
+                high[:, inner], np.fmax.reduceat(curves, starts, axis=1)[:, inner]
+            )
+        column = np.broadcast_to(columns, low.shape)
+        valid = ~(np.isnan(low) | np.isnan(high))
+        if valid.all():
+            low, high, column = low.ravel(), high.ravel(), column.ravel()
+        else:
+            low, high, column = low[valid], high[valid], column[valid]
+        row_low, row_high = (
+            np.clip((values_ - y_range[0]) * y_scale, 0, height - 1).astype(np.int64)
+            for values_ in (low, high)
+        )
+        weights = 1.0 / (row_high - row_low + 1) if normalize else None
+        diff += np.bincount(row_low * width + column, weights, minlength=len(diff))
+        diff -= np.bincount((row_high + 1) * width + column, weights, minlength=len(diff))
+    return np.cumsum(diff.reshape(height + 1, width), axis=0)[:height]
+
+
+def category_image(grids: Iterable[Tuple[int, np.ndarray]], colors: Sequence[str]) -> np.ndarray:
+    """[Colours a stack of per-category count grids: every pixel gets the colour of the category
+    with the most hits there, and an opacity growing with the logarithm of that count. Grids
+    are consumed one at a time, so memory does not grow with the number of categories]
+
+    Arguments:
+        grids {Iterable[Tuple[int, np.ndarray]]} -- [(category code, counts) pairs, all grids
+        of the same shape]
+        colors {Sequence[str]} -- [Hex colour per category code]
+
+    Returns:
+        np.ndarray -- [uint32 RGBA image for 'image_rgba', 0 where there are no hits]
+    """
+    best = best_code = None
+    for code, counts in grids:
+        if best is None:
+            best = np.zeros(counts.shape)
+            best_code = np.zeros(counts.shape, dtype=np.int64)
+        larger = counts > best
+        best = np.where(larger, counts, best)
+        best_code = np.where(larger, code, best_code)
+    if best is None:
+        return np.zeros((1, 1), dtype=np.uint32)
+    rgb = np.array(
+        [[int(color.lstrip("#")[i : i + 2], 16) for i in (0, 2, 4)] for color in colors],
+        dtype=np.uint32,
+    )
+    alpha = np.log1p(best) / np.log1p(max(best.max(), 1))
+    alpha = np.where(best > 0, 64 + 191 * alpha, 0).astype(np.uint32)
+    pixel = rgb[best_code]
+    return pixel[..., 0] | (pixel[..., 1] << 8) | (pixel[..., 2] << 16) | (alpha << 24)
+
+
+def series_image(
+    series: List[dict],
+    x_key: str,
+    y_key: str,
+    colors: Sequence[str],
+    width: int,
+    height: int,
+) -> Tuple[np.ndarray, float, float, float, float]:
+    """[Aggregates point series (one per category) into a 'category_image' of their extent]
+
+    Arguments:
+        series {List[dict]} -- [Series with x- and y-arrays, series i has category code i]
+        x_key {str} -- [Key of the x-values (numbers or datetimes)]
+        y_key {str} -- [Key of the y-values]
+        colors {Sequence[str]} -- [Hex colour per category code]
+        width {int} -- [Image width in pixels]
+        height {int} -- [Image height in pixels]
+
+    Returns:
+        Tuple[np.ndarray, float, float, float, float] -- [Image, x, y, dw and dh for
+        'image_rgba']
+    """
+    xs = [to_numeric(item[x_key]) for item in series]
+    ys = [np.asarray(item[y_key], dtype=np.float64) for item in series]
+    x_all, y_all = np.concatenate(xs), np.concatenate(ys)
+    finite = np.isfinite(x_all) & np.isfinite(y_all)
+    if not finite.any():
+        return np.zeros((1, 1), dtype=np.uint32), 0, 0, 1, 1
+    x_range = (x_all[finite].min(), x_all[finite].max())
+    y_range = (y_all[finite].min(), y_all[finite].max())
+    # Degenerate extents get a width of one unit, so that the edges stay increasing
+    x_range = x_range if x_range[1] > x_range[0] else (x_range[0] - 0.5, x_range[0] + 0.5)
+    y_range = y_range if y_range[1] > y_range[0] else (y_range[0] - 0.5, y_range[0] + 0.5)
+    x_edges = np.linspace(x_range[0], x_range[1], width + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], height + 1)
+    grids = (
+        (code, np.histogram2d(y, x, bins=[y_edges, x_edges])[0])
+        for code, (x, y) in enumerate(zip(xs, ys))
+    )
+    image = category_image(grids, colors)
+    return image, x_range[0], y_range[0], x_range[1] - x_range[0], y_range[1] - y_range[0]
@@ -0,0 +1,133 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from Downsampling import to_numeric
+
+# Payload budgets for figures. Bokeh embeds numeric arrays base64-encoded (4/3 of their raw
+# size, datetimes as float64 milliseconds), so the size of a document can be estimated from the
+# arrays before any source is built. When a budget is exceeded, plots step down through the
+# strategies below, in this order, and use the first one that fits:
+#   "none"      -- the data as is
+#   "narrow"    -- float64 to float32 and int64 to int32 where no visible precision is lost
+#   "decimate"  -- fewer points per series, picked by the plot (e.g. M4 for lines)
+#   "image"     -- the data is aggregated into an RGBA image drawn in place of the glyphs
+
+STRATEGIES = ("none", "narrow", "decimate", "image")
+
+Series = Dict[str, np.ndarray]
+
+
+def serialized_bytes(values: np.ndarray) -> int:
+    """[Estimated size of an array in the document: base64 for numeric arrays, about 20
+    characters per element for anything else (sent as JSON lists)]
+
+    Arguments:
+        values {np.ndarray} -- [Array]
+
+    Returns:
+        int -- [Estimated bytes]
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in "fiub":
+        return int(values.size * values.itemsize * 4 / 3)
+    if values.dtype.kind == "M":
+        return int(values.size * 8 * 4 / 3)
+    return int(values.size * 20)
+
+
+def payload(series: List[Series]) -> Tuple[int, int]:
+    """[Points and estimated bytes of a list of series (one dict of arrays per glyph)]
+
+    Arguments:
+        series {List[Series]} -- [Series]
+
+    Returns:
+        Tuple[int, int] -- [Number of points (values of the largest array of every series),
+        estimated bytes]
+    """
+    points = sum(max((np.size(values) for values in item.values()), default=0) for item in series)
+    return points, sum(serialized_bytes(values) for item in series for values in item.values())
+
+
+def narrow_array(values: np.ndarray) -> np.ndarray:
+    """[Smaller dtype for an array where that loses no visible precision: float64 (and
+    datetimes, as milliseconds) become float32 when float32 steps stay below 1/8192 of the
+    value range, int64 becomes int32 when all values fit]
+
+    Arguments:
+        values {np.ndarray} -- [Array]
+
+    Returns:
+        np.ndarray -- [Narrowed array, or the input]
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "M":
+        values = to_numeric(values)
+    if values.dtype == np.float64:
+        finite = values[np.isfinite(values)]
+        if not len(finite):
+            return values.astype(np.float32)
+        span = finite.max() - finite.min()
+        if np.abs(finite).max() * 2.0 ** -24 <= span / 8192:
+            return values.astype(np.float32)
+    elif values.dtype == np.int64 and values.size:
+        info = np.iinfo(np.int32)
+        if info.min <= values.min() and values.max() <= info.max:
+            return values.astype(np.int32)
+    return values
+
+
+def stride_indices(n: int, fraction: float) -> np.ndarray:
+    """[Evenly spaced indices keeping about 'fraction' of 'n' points (at least one)]"""
+    keep = max(int(n * fraction), 1) if n else 0
+    return np.unique(np.linspace(0, n - 1, keep).astype(np.int64)) if keep else np.arange(0)
+
+
+def fits(points: int, n_bytes: int, max_points: Optional[int], max_bytes: Optional[int]) -> bool:
+    """[True if both limits (None for no limit) are kept]"""
+    return (max_points is None or points <= max_points) and (
+        max_bytes is None or n_bytes <= max_bytes
+    )
+
+
+def fit_series(
+    series: List[Series],
+    max_bytes: Optional[int],
+    max_points: Optional[int],
+    decimate: Callable[[Series, float], Series],
+    min_fraction: float = 0.05,
+) -> Tuple[str, List[Series], Tuple[int, int]]:
+    """[Picks the first strategy (see the top of the module) whose payload fits the budget and
+    applies it, except "image", which is left to the caller]
+
+    Arguments:
+        series {List[Series]} -- [Series of the plot, one dict of arrays per glyph]
+        max_bytes {Optional[int]} -- [Largest estimated size, None for no limit]
+        max_points {Optional[int]} -- [Largest number of points, None for no limit]
+        decimate {Callable[[Series, float], Series]} -- [Reduces one series to about the given
+        fraction of its points]
+
+    Keyword Arguments:
+        min_fraction {float} -- [Decimation keeping less than this fraction of the points is
+        skipped in favour of an image; 0 for no image, the decimated series are returned even
+        if they still do not fit] (default: {0.05})
+
+    Returns:
+        Tuple[str, List[Series], Tuple[int, int]] -- [Strategy, series to draw (the input for
+        "image") and the estimated (points, bytes) of the input]
+    """
+    estimate = payload(series)
+    if fits(*estimate, max_points, max_bytes):
+        return "none", series, estimate
+    narrowed = [{key: narrow_array(values) for key, values in item.items()} for item in series]
+    points, n_bytes = payload(narrowed)
+    if fits(points, n_bytes, max_points, max_bytes):
+        return "narrow", narrowed, estimate
+    fraction = min(
+        1.0 if max_points is None else max_points / max(points, 1),
+        1.0 if max_bytes is None else max_bytes / max(n_bytes, 1),
+    )
+    if fraction >= min_fraction:
+        decimated = [decimate(item, fraction) for item in narrowed]
+        if min_fraction <= 0 or fits(*payload(decimated), max_points, max_bytes):
+            return "decimate", decimated, estimate
+    return "image", series, estimate
@@ -0,0 +1,123 @@
+import sys
+import time
+from typing import List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Category columns are encoded once into compact integer codes. Partitioning and colour
+# assignment then work on int arrays, and the string labels are only needed for the legend.
+
+
+def encode_categories(values) -> Tuple[np.ndarray, np.ndarray]:
+    """[Encodes a category column into integer codes, in order of first appearance (the order of
+    'unique()'). Fast for columns that already are 'pd.Categorical', see 'to_categorical']
+
+    Arguments:
+        values {array-like} -- [Category column]
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- [Codes (-1 for missing values) and the labels]
+    """
+    codes, labels = pd.factorize(values, sort=False)
+    return codes, np.asarray(labels)
+
+
+def partition(codes: np.ndarray, n_categories: int) -> Tuple[np.ndarray, np.ndarray]:
+    """[Groups the rows by category with one stable (radix) sort of the codes, instead of one
+    equality mask per category. Rows of category 'k' are 'order[bounds[k]:bounds[k + 1]]',
+    in their original order; rows with missing category (code -1) are left out]
+
+    Arguments:
+        codes {np.ndarray} -- [Integer codes from 'encode_categories']
+        n_categories {int} -- [Number of categories]
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- [Row order and the n_categories + 1 bounds]
+    """
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=n_categories)
+    bounds = np.r_[0, np.cumsum(counts)] + np.count_nonzero(codes < 0)
+    return order, bounds
+
+
+def category_colors(palette: Sequence[str], n_categories: int) -> List[str]:
+    """[Colour of every category code, cycling through the palette when there are more
+    categories than colours]
+
+    Arguments:
+        palette {Sequence[str]} -- [List of colours]
+        n_categories {int} -- [Number of categories]
+
+    Returns:
+        List[str] -- [Colour per category code]
+    """
+    return [palette[code % len(palette)] for code in range(n_categories)]
+
+
+def top_k(totals: np.ndarray, k: int) -> np.ndarray:
+    """[Codes of the 'k' largest totals, largest first. Uses a partial sort ('argpartition'),
+    so only the 'k' selected totals are fully sorted]
+
+    Arguments:
+        totals {np.ndarray} -- [Total per category code, e.g. from 'np.bincount']
+        k {int} -- [Number of categories to keep]
+
+    Returns:
+        np.ndarray -- [Codes of the kept categories]
+    """
+    if k < len(totals):
+        top = np.argpartition(totals, len(totals) - k)[len(totals) - k :]
+    else:
+        top = np.arange(len(totals))
+    return top[np.argsort(-totals[top], kind="stable")]
+
+
+def to_categorical(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """[Converts category columns to 'pd.Categorical' once at ingestion, so later plots encode
+    them without hashing strings again]
+
+    Arguments:
+        df {pd.DataFrame} -- [Dataframe]
+        columns {List[str]} -- [Names of the category columns]
+
+    Returns:
+        pd.DataFrame -- [Dataframe with the converted columns]
+    """
+    return df.astype({col: "category" for col in columns})
+
+
+if __name__ == "__main__":
+
+    # Benchmark: python Categories.py [rows] [categories]
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    n_categories = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = np.random.default_rng(0)
+    names = np.array(["sensor_{:05d}".format(i) for i in range(n_categories)], dtype=object)
+    column = pd.Series(names[rng.integers(0, n_categories, rows)])
+
+    # Previous approach: unique() plus one equality mask per category, timed on a few
+    # categories and extrapolated
+    sample = 20
+    start = time.perf_counter()
+    uniques = column.unique()
+    for category in uniques[:sample]:
+        np.flatnonzero((column == category).to_numpy())
+    masks = (time.perf_counter() - start) * n_categories / sample
+
+    start = time.perf_counter()
+    codes, labels = encode_categories(column)
+    order, bounds = partition(codes, len(labels))
+    groups = [order[bounds[k] : bounds[k + 1]] for k in range(len(labels))]
+    encoded = time.perf_counter() - start
+
+    categorical = to_categorical(column.to_frame("category"), ["category"])["category"]
+    start = time.perf_counter()
+    codes, labels = encode_categories(categorical)
+    order, bounds = partition(codes, len(labels))
+    groups = [order[bounds[k] : bounds[k + 1]] for k in range(len(labels))]
+    precoded = time.perf_counter() - start
+
+    print("{:,} rows x {:,} categories".format(rows, n_categories))
+    print("equality masks (extrapolated): {:8.2f} s".format(masks))
+    print("factorize + partition:         {:8.2f} s".format(encoded))
+    print("pd.Categorical + partition:    {:8.2f} s".format(precoded))
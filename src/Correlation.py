@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.cluster import hierarchy
+    from scipy.spatial.distance import squareform
+except ImportError:  # Only needed for reordering by hierarchical clustering
+    hierarchy = squareform = None
+
+# Correlation matrices of wide tables, computed block by block in float32. Missing values are
+# handled pairwise: every pair of columns uses the rows where both values are present.
+
+
+def correlation_matrix(
+    df: pd.DataFrame, method: str = "pearson", block_size: int = 512
+) -> np.ndarray:
+    """[Pearson/Spearman correlation of all columns, with pairwise-complete observations. Column
+    blocks are combined with matrix products of the values and of their NaN masks, so no more
+    than (rows x 2 blocks) values are expanded at once and the result is float32]
+
+    Arguments:
+        df {pd.DataFrame} -- [Numeric columns]
+
+    Keyword Arguments:
+        method {str} -- ["pearson" or "spearman". Spearman ranks every column once over its
+        present values, so with missing values it differs slightly from ranking every pair
+        separately] (default: {"pearson"})
+        block_size {int} -- [Number of columns per block] (default: {512})
+
+    Returns:
+        np.ndarray -- [float32 matrix of shape (columns, columns)]
+    """
+    if method == "spearman":
+        df = df.rank()
+    elif method != "pearson":
+        raise ValueError("method must be 'pearson' or 'spearman'")
+    values = df.to_numpy(dtype=np.float32)
+    present = ~np.isnan(values)
+    # Centering on the column means keeps the float32 sums accurate
+    values = np.where(present, values - np.nanmean(values, axis=0), 0).astype(np.float32)
+    mask = present.astype(np.float32)
+    complete = bool(present.all())
+    n_columns = values.shape[1]
+    result = np.empty((n_columns, n_columns), dtype=np.float32)
+    for i in range(0, n_columns, block_size):
+        block_i = slice(i, i + block_size)
+        x, mask_x = values[:, block_i], mask[:, block_i]
+        for j in range(i, n_columns, block_size):
+            block_j = slice(j, j + block_size)
+            y, mask_y = values[:, block_j], mask[:, block_j]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                if complete:
+                    # Centered columns: the sums of x and y are zero
+                    covariance = x.T @ y
+                    variance_x = (x * x).sum(axis=0)[:, None]
+                    variance_y = (y * y).sum(axis=0)[None, :]
+                else:
+                    count = mask_x.T @ mask_y
+                    sum_x = x.T @ mask_y
+                    sum_y = mask_x.T @ y
+                    covariance = x.T @ y - sum_x * sum_y / count
+                    variance_x = (x * x).T @ mask_y - sum_x * sum_x / count
+                    variance_y = mask_x.T @ (y * y) - sum_y * sum_y / count
+                block = covariance / np.sqrt(variance_x * variance_y)
+            result[block_i, block_j] = np.clip(block, -1, 1)
+            result[block_j, block_i] = result[block_i, block_j].T
+    return result
+
+
+def cluster_order(correlation: np.ndarray) -> np.ndarray:
+    """[Column order grouping correlated columns, from average-linkage hierarchical clustering
+    on the distance 1 - |r|]
+
+    Arguments:
+        correlation {np.ndarray} -- [Correlation matrix]
+
+    Returns:
+        np.ndarray -- [Permutation of the columns]
+    """
+    if hierarchy is None:
+        raise ImportError("Reordering by hierarchical clustering requires 'scipy'")
+    distance = 1 - np.abs(np.nan_to_num(correlation.astype(np.float64)))
+    np.fill_diagonal(distance, 0)
+    distance = (distance + distance.T) / 2
+    linkage = hierarchy.linkage(squareform(distance, checks=False), method="average")
+    return hierarchy.leaves_list(linkage)
@@ -0,0 +1,158 @@
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow/Parquet input is optional
+    pa = ds = pq = None
+
+# Inputs of the plot methods besides pd.DataFrame. Only the columns (and rows) a plot needs are
+# read, so large Parquet files, Arrow tables and memory-mapped arrays are never materialized in
+# full by pandas.
+
+OPERATORS = {
+    "==": lambda a, b: a == b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: np.isin(a, list(b)),
+    "not in": lambda a, b: ~np.isin(a, list(b)),
+}
+
+
+class LazyTable:
+    def __init__(
+        self,
+        data: Any,
+        filters: Optional[List[Tuple[str, str, Any]]] = None,
+        row_range: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """[Wraps an input table together with a row filter and/or row range, so that it can be
+        passed to the plot methods instead of a dataframe]
+
+        Arguments:
+            data {Any} -- [pd.DataFrame, pyarrow.Table, Parquet file/folder path, NumPy
+            structured array/memmap or dict of column name -> 1-D array]
+
+        Keyword Arguments:
+            filters {List[Tuple[str, str, Any]]} -- [Row predicates in Parquet notation, all of
+            them must hold. For e.g.: [("category", "in", ["a", "b"]), ("values", ">", 0)];
+            pushed down to the Parquet reader] (default: {None})
+            row_range {Tuple[int, int]} -- [Only the rows start:stop are read] (default: {None})
+        """
+        self.data = data
+        self.filters = filters
+        self.row_range = row_range
+
+
+def read_frame(data: Any, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """[Returns a dataframe with only the requested columns (and the filtered rows for a
+    'LazyTable'). A dataframe without filters is returned as it is]
+
+    Arguments:
+        data {Any} -- [pd.DataFrame, LazyTable, pyarrow.Table, Parquet file/folder path, NumPy
+        structured array/memmap or dict of column name -> 1-D array]
+
+    Keyword Arguments:
+        columns {List[str]} -- [Columns needed by the plot, all columns when None]
+        (default: {None})
+
+    Returns:
+        pd.DataFrame -- [Dataframe of the needed columns and rows]
+    """
+    filters, row_range = None, None
+    if isinstance(data, LazyTable):
+        data, filters, row_range = data.data, data.filters, data.row_range
+    if columns is not None:
+        # Unique, in order of first appearance
+        columns = list(dict.fromkeys(columns))
+
+    if isinstance(data, pd.DataFrame):
+        if filters is None and row_range is None:
+            return data
+        frame = data if row_range is None else data.iloc[slice(*row_range)]
+        if filters is not None:
+            frame = frame.loc[_filter_mask(frame, filters)]
+        return frame if columns is None else frame[columns]
+
+    if isinstance(data, (str, Path)):
+        return _read_parquet(data, columns, filters, row_range)
+
+    if pa is not None and isinstance(data, pa.Table):
+        if row_range is not None:
+            data = data.slice(row_range[0], row_range[1] - row_range[0])
+        if filters is not None:
+            data = ds.dataset(data).to_table(
+                columns=columns, filter=pq.filters_to_expression(filters)
+            )
+        elif columns is not None:
+            data = data.select(columns)
+        return data.to_pandas()
+
+    if isinstance(data, np.ndarray) and data.dtype.names is not None:
+        names = list(data.dtype.names)
+    elif isinstance(data, dict):
+        names = list(data.keys())
+    else:
+        raise TypeError("Unsupported input type: {}".format(type(data).__name__))
+    # Column-wise access: slicing a memmap only maps the requested rows
+    rows = slice(None) if row_range is None else slice(*row_range)
+    needed = names if columns is None else columns
+    if filters is not None:
+        needed = list(dict.fromkeys(needed + [f[0] for f in filters]))
+    frame = pd.DataFrame({col: np.asarray(data[col][rows]) for col in needed})
+    if filters is not None:
+        frame = frame.loc[_filter_mask(frame, filters)]
+    return frame if columns is None else frame[columns]
+
+
+def _filter_mask(frame: pd.DataFrame, filters: List[Tuple[str, str, Any]]) -> np.ndarray:
+    """[Boolean mask of the rows of 'frame' matching all the filters]"""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, operator, value in filters:
+        mask &= np.asarray(OPERATORS[operator](frame[column].to_numpy(), value))
+    return mask
+
+
+def _read_parquet(
+    path: Any,
+    columns: Optional[List[str]],
+    filters: Optional[List[Tuple[str, str, Any]]],
+    row_range: Optional[Tuple[int, int]],
+) -> pd.DataFrame:
+    """[Reads a Parquet file/folder with column projection, predicate pushdown and reading only
+    the row groups overlapping 'row_range' (in file order for a folder)]"""
+    if pq is None:
+        raise ImportError("Reading Parquet files requires 'pyarrow'")
+    if row_range is None:
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    start, stop = row_range
+    fragments, offset, first_row = [], 0, None
+    for fragment in dataset.get_fragments():
+        for group in fragment.split_by_row_group():
+            rows = group.row_groups[0].num_rows
+            if offset < stop and offset + rows > start:
+                fragments.append(group)
+                first_row = offset if first_row is None else first_row
+            offset += rows
+        if offset >= stop:
+            break
+    if not fragments:
+        return dataset.schema.empty_table().select(columns or dataset.schema.names).to_pandas()
+    needed = columns
+    if columns is not None and filters is not None:
+        needed = list(dict.fromkeys(columns + [f[0] for f in filters]))
+    # The overlapping row groups only, partition columns of a folder included
+    table = ds.FileSystemDataset(
+        fragments, dataset.schema, dataset.format, dataset.filesystem
+    ).to_table(columns=needed)
+    table = table.slice(start - first_row, stop - start)
+    return read_frame(LazyTable(table, filters=filters), columns)
@@ -0,0 +1,172 @@
+from typing import Tuple
+import numpy as np
+
+# Helpers reducing sorted (x, y) series to what can actually be seen on a plot of a given
+# pixel width. All functions work on NumPy arrays; datetime x-values are handled through
+# 'to_numeric', which gives the milliseconds since epoch Bokeh uses on its axes.
+
+
+def to_numeric(values) -> np.ndarray:
+    """[Converts x-values to a float array, datetimes become milliseconds since epoch]
+
+    Arguments:
+        values {array-like} -- [Numbers or datetimes]
+
+    Returns:
+        np.ndarray -- [float64 array]
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64) / 1e6
+    return values.astype(np.float64, copy=False)
+
+
+def pixel_buckets(
+    x: np.ndarray, x_start: float, x_end: float, width: int
+) -> np.ndarray:
+    """[Maps x-values to the pixel column they fall in, for a plot showing 'x_start' to 'x_end'
+    on 'width' pixels. Values outside the range are clipped to the first/last column]
+
+    Arguments:
+        x {np.ndarray} -- [Numeric x-values]
+        x_start {float} -- [Left end of the visible range]
+        x_end {float} -- [Right end of the visible range]
+        width {int} -- [Number of pixel columns]
+
+    Returns:
+        np.ndarray -- [int64 array with the pixel column of each value]
+    """
+    span = (x_end - x_start) or 1.0
+    buckets = np.floor((x - x_start) * (width / span)).astype(np.int64)
+    return np.clip(buckets, 0, width - 1)
+
+
+def m4_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    width: int,
+    x_start: float = None,
+    x_end: float = None,
+) -> np.ndarray:
+    """[M4 aggregation: keeps the first, last, minimum and maximum point of every pixel column.
+    A line drawn through the kept points rasterizes to the same pixels as the full series]
+
+    Arguments:
+        x {np.ndarray} -- [Numeric x-values, sorted ascending]
+        y {np.ndarray} -- [y-values]
+        width {int} -- [Number of pixel columns]
+
+    Keyword Arguments:
+        x_start {float} -- [Left end of the visible range, first x-value when None]
+        (default: {None})
+        x_end {float} -- [Right end of the visible range, last x-value when None]
+        (default: {None})
+
+    Returns:
+        np.ndarray -- [Sorted indices of the points to keep]
+    """
+    n = len(x)
+    if n <= 4 * width:
+        return np.arange(n)
+    x_start = x[0] if x_start is None else x_start
+    x_end = x[-1] if x_end is None else x_end
+    buckets = pixel_buckets(x, x_start, x_end, width)
+    # x is sorted, so every pixel column is one contiguous run of points
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    # Sorting by (bucket, y) keeps the runs in place and orders every run by y
+    order = np.lexsort((y, buckets))
+    return np.unique(np.concatenate([starts, ends, order[starts], order[ends]]))
+
+
+def envelope(
+    x: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    width: int,
+    x_start: float = None,
+    x_end: float = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """[Reduces a band (e.g. mean +/- k sigma) to one point per pixel column: the first x-value,
+    the lowest 'low' and the highest 'high' of the column, so the band never gets narrower]
+
+    Arguments:
+        x {np.ndarray} -- [Numeric x-values, sorted ascending]
+        low {np.ndarray} -- [Lower edge of the band]
+        high {np.ndarray} -- [Upper edge of the band]
+        width {int} -- [Number of pixel columns]
+
+    Keyword Arguments:
+        x_start {float} -- [Left end of the visible range, first x-value when None]
+        (default: {None})
+        x_end {float} -- [Right end of the visible range, last x-value when None]
+        (default: {None})
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray] -- [x, low and high per pixel column]
+    """
+    if len(x) <= 4 * width:
+        return x, low, high
+    x_start = x[0] if x_start is None else x_start
+    x_end = x[-1] if x_end is None else x_end
+    buckets = pixel_buckets(x, x_start, x_end, width)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    return x[starts], np.fmin.reduceat(low, starts), np.fmax.reduceat(high, starts)
+
+
+def m4_columns(block: np.ndarray, width: int, column_chunk: int = 256) -> np.ndarray:
+    """[M4 aggregation of many series sharing the row index as x-values (x = 0, ..., n - 1):
+    first, last, minimum and maximum row of every pixel column, for all columns of the 2D
+    block at once. The per-bucket reductions run along axis 0 with 'reduceat' (a segmented
+    reshape-and-reduce, since pixel columns do not all hold the same number of rows)]
+
+    Arguments:
+        block {np.ndarray} -- [Values, shape (n_rows, n_columns)]
+        width {int} -- [Number of pixel columns the x-range 0 to n_rows - 1 is drawn on]
+
+    Keyword Arguments:
+        column_chunk {int} -- [Number of columns reduced at once, bounds temporary memory]
+        (default: {256})
+
+    Returns:
+        np.ndarray -- [Kept row positions per column, shape (n_kept, n_columns), ascending]
+    """
+    n, m = block.shape
+    if n <= 4 * width:
+        return np.broadcast_to(np.arange(n)[:, None], (n, m))
+    buckets = pixel_buckets(np.arange(n), 0, n - 1, width)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    counts = ends - starts + 1
+    rows = np.arange(n)[:, None]
+    positions = np.empty((len(starts), 4, m), dtype=np.int64)
+    positions[:, 0, :] = starts[:, None]
+    positions[:, 3, :] = ends[:, None]
+    for first in range(0, m, column_chunk):
+        part = block[:, first : first + column_chunk]
+        for slot, reduce in ((1, np.fmin), (2, np.fmax)):
+            extreme = np.repeat(reduce.reduceat(part, starts, axis=0), counts, axis=0)
+            # First row of every bucket holding the extreme value (n if all values are NaN)
+            hit = np.minimum.reduceat(np.where(part == extreme, rows, n), starts, axis=0)
+            positions[:, slot, first : first + column_chunk] = np.where(
+                hit == n, starts[:, None], hit
+            )
+    positions.sort(axis=1)
+    return positions.reshape(-1, m)
+
+
+def visible_slice(x: np.ndarray, x_start: float, x_end: float) -> slice:
+    """[Binary search of the sorted x-values for the visible window, including one point on
+    each side so that lines leave the plot at the right angle]
+
+    Arguments:
+        x {np.ndarray} -- [Numeric x-values, sorted ascending]
+        x_start {float} -- [Left end of the visible range]
+        x_end {float} -- [Right end of the visible range]
+
+    Returns:
+        slice -- [Slice of the visible points]
+    """
+    lo = max(np.searchsorted(x, x_start, side="left") - 1, 0)
+    hi = min(np.searchsorted(x, x_end, side="right") + 1, len(x))
+    return slice(lo, hi)
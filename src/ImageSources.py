@@ -0,0 +1,188 @@
+import mmap
+import struct
+import tarfile
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+# Inputs of the picture plots besides image file paths: NumPy arrays (used as they are), encoded
+# image bytes and members of zip/tar archives. Archives are memory-mapped and their members are
+# decoded in memory, nothing is extracted to disk.
+
+ZIP_LOCAL_HEADER = 30
+
+
+class ArchiveMember:
+    def __init__(self, archive: Any, name: str) -> None:
+        """[Refers to an image inside a zip or tar archive, so that it can be passed to the
+        picture plots instead of a file path]
+
+        Arguments:
+            archive {Any} -- [Path of the archive, or an open 'ImageArchive']
+            name {str} -- [Name of the member inside the archive]
+        """
+        self.archive = archive
+        self.name = name
+
+
+class ImageArchive:
+    def __init__(self, path: str) -> None:
+        """[Opens a zip or tar archive (plain or compressed tar) for reading its members as
+        images. The file is memory-mapped: members stored uncompressed (usual for PNG/JPEG, which
+        are compressed already) are decoded straight from the mapping, others are decompressed
+        in memory]
+
+        Arguments:
+            path {str} -- [Path of the archive]
+        """
+        self.path = str(path)
+        self.__file = open(self.path, "rb")
+        self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__zip, self.__tar, self.__members = None, None, {}
+        try:
+            if zipfile.is_zipfile(self.__file):
+                # The directory is read through the file ('zipfile' needs a seekable() file
+                # object, which mmap has only from Python 3.13), the members through the mapping
+                self.__zip = zipfile.ZipFile(self.__file)
+                self.__members = {info.filename: info for info in self.__zip.infolist()}
+            else:
+                self.__map.seek(0)
+                self.__tar = tarfile.open(fileobj=self.__map)
+                self.__members = {info.name: info for info in self.__tar.getmembers()}
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> "ImageArchive":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def names(self) -> List[str]:
+        """[Names of the file members of the archive]"""
+        if self.__zip is not None:
+            return [name for name, info in self.__members.items() if not info.is_dir()]
+        return [name for name, info in self.__members.items() if info.isfile()]
+
+    def __member(self, name: str) -> Any:
+        if name not in self.__members:
+            raise KeyError(f"'{name}' is not a member of '{self.path}'")
+        return self.__members[name]
+
+    def __span(self, name: str) -> Optional[Tuple[int, int, int]]:
+        """[Start and stop of the raw bytes of a member in the mapping and their compression
+        ('zipfile.ZIP_STORED' for uncompressed bytes), None if they cannot be read from it]"""
+        info = self.__member(name)
+        if self.__zip is not None:
+            if info.flag_bits & 0x1:
+                return None
+            # The local header repeats the name and has its own extra field
+            header = info.header_offset
+            name_length, extra_length = struct.unpack_from("<HH", self.__map, header + 26)
+            start = header + ZIP_LOCAL_HEADER + name_length + extra_length
+            return start, start + info.compress_size, info.compress_type
+        # Only a plain tar reads the mapping itself
+        if self.__tar.fileobj is not self.__map or not info.isfile():
+            return None
+        return info.offset_data, info.offset_data + info.size, zipfile.ZIP_STORED
+
+    def read(self, name: str) -> bytes:
+        """[Encoded bytes of a member]
+
+        Arguments:
+            name {str} -- [Name of the member]
+
+        Returns:
+            bytes -- [Content of the member]
+        """
+        span = self.__span(name)
+        if span is not None and span[2] == zipfile.ZIP_STORED:
+            return self.__map[span[0] : span[1]]
+        if span is not None and span[2] == zipfile.ZIP_DEFLATED:
+            with memoryview(self.__map)[span[0] : span[1]] as raw:
+                return zlib.decompress(raw, -zlib.MAX_WBITS)
+        if self.__zip is not None:
+            return self.__zip.read(name)
+        return self.__tar.extractfile(self.__member(name)).read()
+
+    def decode(self, name: str) -> np.ndarray:
+        """[Decoded image of a member, without copying its encoded bytes when it is stored
+        uncompressed]
+
+        Arguments:
+            name {str} -- [Name of the member]
+
+        Returns:
+            np.ndarray -- [RGB image]
+        """
+        span = self.__span(name)
+        if span is None or span[2] != zipfile.ZIP_STORED:
+            return decode_image(self.read(name))
+        encoded = np.frombuffer(self.__map, np.uint8, count=span[1] - span[0], offset=span[0])
+        try:
+            return decode_image(encoded)
+        finally:
+            # The mapping cannot be closed while an array still points into it
+            del encoded
+
+    def close(self) -> None:
+        """[Closes the archive and its mapping]"""
+        for handle in (self.__zip, self.__tar, self.__map, self.__file):
+            if handle is not None:
+                handle.close()
+        self.__zip = self.__tar = self.__map = self.__file = None
+
+
+def decode_image(data: Any) -> np.ndarray:
+    """[Decodes an encoded image (PNG, JPEG, ... as supported by OpenCV)]
+
+    Arguments:
+        data {Any} -- [bytes, bytearray, memoryview or 1-D uint8 array]
+
+    Returns:
+        np.ndarray -- [RGB image]
+    """
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Image bytes could not be decoded")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def load_image(source: Any, archives: Optional[Dict[str, ImageArchive]] = None) -> np.ndarray:
+    """[Image of any picture plot input. NumPy arrays are returned as they are (no copy) and
+    are taken to be RGB(A) or grayscale already]
+
+    Arguments:
+        source {Any} -- [File path, np.ndarray, encoded bytes or 'ArchiveMember']
+
+    Keyword Arguments:
+        archives {Dict[str, ImageArchive]} -- [Open archives by path, archives opened for
+        'source' are added and left open for the next images; when None, an archive is opened
+        for this image only] (default: {None})
+
+    Returns:
+        np.ndarray -- [RGB image (or grayscale for a grayscale array)]
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return decode_image(source)
+    if isinstance(source, ArchiveMember):
+        archive = source.archive
+        if isinstance(archive, ImageArchive):
+            return archive.decode(source.name)
+        if archives is None:
+            with ImageArchive(archive) as opened:
+                return opened.decode(source.name)
+        key = str(Path(archive))
+        if key not in archives:
+            archives[key] = ImageArchive(key)
+        return archives[key].decode(source.name)
+    image = cv2.imread(str(source))
+    if image is None:
+        raise ValueError(f"Image '{source}' could not be read")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
@@ -1,13 +1,23 @@
+from bokeh.document import Document
+from bokeh.io import curdoc
 from bokeh.models import (
     ColumnDataSource,
     HoverTool,
-    CategoricalColorMapper,
+    Range1d,
 )
 from bokeh.models.formatters import DatetimeTickFormatter
-from bokeh.plotting import show
 import pandas as pd
 import numpy as np
+from typing import Any, Callable, List, Tuple
 from Visualization import Visualization
+from Downsampling import envelope, m4_columns, m4_indices, to_numeric, visible_slice
+from ServerTools import debounce
+from PyramidStore import PyramidReader
+from DataSources import read_frame
+from Categories import encode_categories, partition, category_colors
+from Binning import category_image, rasterize_lines, series_image
+from Budget import serialized_bytes
+from Rolling import window_starts, rolling_mean_std, rolling_min_max
 
 # output_file("Line Plots.html", title="Line Plots")
 
@@ -48,10 +58,17 @@ class LinePlots(Visualization):
         )
 
     def generate_multiline_plot_by_columns(
-        self, data: dict, df: pd.DataFrame, legend_title: str, xaxis_padding: float = 0
+        self,
+        data: dict,
+        df: pd.DataFrame,
+        legend_title: str,
+        xaxis_padding: float = 0,
+        target_width: int = None,
     ) -> None:
         """[Generate multiline plot by passing the dataframe 'columns' as 'values' and 'category'
-        as 'keys' in the input dictionary - 'data']
+        as 'keys' in the input dictionary - 'data'. With a payload budget on the instance
+        ('max_bytes'/'max_points'), the curves are narrowed, M4-decimated or drawn as an image as
+        needed]
 
         Arguments:
             data {dict} -- [Accepts keys as unique categories and values as columns in the
@@ -61,29 +78,56 @@ class LinePlots(Visualization):
                 "Category2": ["col4", "col5", "col6"]
             }
             ]
-            df {pd.DataFrame} -- [Dataframe with columns as different curves]
+            df {pd.DataFrame} -- [Dataframe with columns as different curves (or any input
+            accepted by 'read_frame', only the listed columns are read)]
             legend_title {str} -- [Legends of the plot]
 
         Keyword Arguments:
             xaxis_padding {float} -- [Padding for x-axis] (default: {0})
+            target_width {int} -- [If set, every column is M4-aggregated (first, last, min and
+            max row per pixel column) to this many pixel columns. With the plot's inner width
+            and 'xaxis_padding' 0, the lines rasterize exactly like the full data]
+            (default: {None})
 
         Returns:
             [None]
         """
         try:
+            columns = [col for cols in data.values() for col in cols]
+            df = read_frame(df, columns)
             categories = list(data.keys())
             p = self.figure
-            color_mapper = CategoricalColorMapper(
-                factors=categories, palette=self.colors[: len(categories)]
+            colors = category_colors(self.colors, len(categories))
+            block = df[columns].to_numpy(dtype=np.float64)
+            x = np.arange(0, block.shape[0])
+            column_index = {col: i for i, col in enumerate(columns)}
+            if target_width:
+                # One reduction over the whole (rows x columns) block
+                positions = m4_columns(block, target_width)
+                reduced = np.take_along_axis(block, positions, axis=0)
+            # One row per curve, like 'generate_multiline_plot_by_rows'
+            full, series = [], []
+            for category in categories:
+                index = [column_index[col] for col in data.get(category)]
+                full.append(dict(y=block[:, index].T, x=np.broadcast_to(x, (len(index), len(x)))))
+                if target_width:
+                    series.append(dict(y=reduced[:, index].T, x=positions[:, index].T))
+            series = self.fit_to_budget(
+                series if target_width else full,
+                decimate=self.__decimate_curves,
+                # The image is drawn from the full curves
+                rasterize=lambda _, width, height: self.__rasterize_curves(
+                    full, colors, width, height
+                ),
             )
 
-            for category in categories:
-                count = len(data.get(category))
+            for code, category in enumerate(categories):
+                # One array per curve
+                count = len(series[code]["y"])
                 source = ColumnDataSource(
                     dict(
-                        y=[df[col].tolist() for col in list(data.get(category))],
-                        x=[list(np.arange(0, df.shape[0]))] * count,
-                        category=[category] * count,
+                        y=list(series[code]["y"]),
+                        x=list(series[code]["x"]),
                         hoverInformation=[category] * count,
                     )
                 )
@@ -92,9 +136,9 @@ class LinePlots(Visualization):
                     ys="y",
                     source=source,
                     alpha=self.transparency,
-                    color={"field": "category", "transform": color_mapper},
+                    color=colors[code],
                     line_width=self.line_width,
-                    legend_group="category",
+                    legend_label=str(category),
                 )
             self.legend_settings(
                 legend_title=legend_title,
@@ -112,9 +156,11 @@ class LinePlots(Visualization):
                     ]
                 )
             )
-            show(p)
+            self.display_figure()
             return True
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
@@ -129,11 +175,12 @@ class LinePlots(Visualization):
     ) -> None:
         """[Generate multiline plot by passing the dataframe, where each row represents one curve,
         all columns represents values of each curve and one additonal column represents category
-        for each curve.]
+        for each curve. With a payload budget on the instance ('max_bytes'/'max_points'), the
+        curves are narrowed, M4-decimated or drawn as an image as needed]
 
         Arguments:
             df {pd.DataFrame} -- [each row represents one curve, plus one additional column for
-            category of the curve]
+            category of the curve (or any input accepted by 'read_frame')]
             category_clmn {str} -- [Name of the category column in dataframe]
 
         Keyword Arguments:
@@ -144,29 +191,38 @@ class LinePlots(Visualization):
             [None]
         """
         try:
-            categories = df[category_clmn].unique()
-            color_mapper = CategoricalColorMapper(
-                factors=categories, palette=self.colors[: len(categories)]
+            df = read_frame(df)
+            codes, labels = encode_categories(df[category_clmn])
+            order, bounds = partition(codes, len(labels))
+            colors = category_colors(self.colors, len(labels))
+            values = df.drop([category_clmn], axis=1).to_numpy()
+            x = np.arange(0, values.shape[1])
+            series = []
+            for code in range(len(labels)):
+                rows = order[bounds[code] : bounds[code + 1]]
+                series.append(dict(y=values[rows], x=np.broadcast_to(x, (len(rows), len(x)))))
+            series = self.fit_to_budget(
+                series,
+                decimate=self.__decimate_curves,
+                rasterize=lambda series, width, height: self.__rasterize_curves(
+                    series, colors, width, height
+                ),
             )
 
-            for category in df[category_clmn].unique():
-                dfnew = df.loc[(df[category_clmn] == category)]
+            for code, label in enumerate(labels):
+                # One array per curve
                 source = ColumnDataSource(
-                    dict(
-                        y=dfnew.drop([category_clmn], axis=1).values.tolist(),
-                        x=[list(np.arange(0, dfnew.shape[1]))] * dfnew.shape[0],
-                        category_clmn=dfnew[category_clmn],
-                        hoverInformation=dfnew[category_clmn],
-                    )
+                    dict(y=list(series[code]["y"]), x=list(series[code]["x"]))
                 )
                 self.figure.multi_line(
                     xs="x",
                     ys="y",
                     source=source,
                     alpha=self.transparency,
-                    color={"field": "category_clmn", "transform": color_mapper},
+                    color=colors[code],
                     line_width=self.line_width,
-                    legend_group="category_clmn",
+                    legend_label=str(label),
+                    name=str(label),
                 )
 
             self.legend_settings(
@@ -179,14 +235,170 @@ class LinePlots(Visualization):
             self.figure.add_tools(
                 HoverTool(
                     tooltips=[
-                        (legend_title, "@hoverInformation"),
+                        (legend_title, "$name"),
                         ("X Value", "$x{1f}"),
                         ("Y Value", "$y{1f}"),
                     ]
                 )
             )
-            show(self.figure)
+            self.display_figure()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_multiline_density_plot(
+        self,
+        df: pd.DataFrame,
+        category_clmn: str,
+        legend_title: str = "Legends",
+        normalize: bool = False,
+        quantile_bands: bool = True,
+        xaxis_padding: float = 0,
+    ) -> None:
+        """[Line-density variant of 'generate_multiline_plot_by_rows' for large curve ensembles:
+        the curves of every category are rasterized into a per-pixel hit-count grid, and the
+        grids are shown as one colour-mapped image (colour by category, opacity by density).
+        Optionally the median and the 5%/95% quantiles across the curves are overlaid. With a
+        payload budget on the instance ('max_bytes'/'max_points'), the image gets coarser pixels
+        to fit 'max_bytes' (half of it with quantile bands) and the bands are M4-decimated to fit
+        the rest]
+
+        Arguments:
+            df {pd.DataFrame} -- [each row represents one curve, plus one additional column for
+            category of the curve (or any input accepted by 'read_frame')]
+            category_clmn {str} -- [Name of the category column in dataframe]
+
+        Keyword Arguments:
+            legend_title {str} -- [Legends of the plot] (default: {"Legends"})
+            normalize {bool} -- [If True, every curve adds the same weight to each pixel column,
+            however steep it is] (default: {False})
+            quantile_bands {bool} -- [Overlay the median line and the 5%-95% band of every
+            category] (default: {True})
+            xaxis_padding {float} -- [Padding for x-axis] (default: {0})
+
+        Returns:
+            [None]
+        """
+        try:
+            df = read_frame(df)
+            p = self.figure
+            codes, labels = encode_categories(df[category_clmn])
+            order, bounds = partition(codes, len(labels))
+            colors = category_colors(self.colors, len(labels))
+            values = df.drop([category_clmn], axis=1).to_numpy(dtype=np.float64)[order]
+            y_range = (np.nanmin(values), np.nanmax(values))
+            image_budget = self.max_bytes
+            if self.max_bytes is not None and quantile_bands:
+                image_budget = self.max_bytes // 2
+            width, height = self.image_size(image_budget)
+            x = np.arange(0, values.shape[1])
+
+            # Opacity from the log-scaled density, colour mixed by the category densities
+            rgb = np.zeros((height, width, 3))
+            weight = np.zeros((height, width))
+            opacity = np.zeros((height, width))
+            for code in range(len(labels)):
+                grid = rasterize_lines(
+                    values[bounds[code] : bounds[code + 1]],
+                    width,
+                    height,
+                    y_range,
+                    normalize=normalize,
+                )
+                density = np.log1p(grid) / max(np.log1p(grid.max()), 1e-12)
+                color = np.array(
+                    [int(colors[code].lstrip("#")[i : i + 2], 16) for i in (0, 2, 4)]
+                )
+                rgb += density[:, :, None] * color
+                weight += density
+                opacity = np.maximum(opacity, density)
+            image = np.zeros((height, width), dtype=np.uint32)
+            view = image.view(dtype=np.uint8).reshape((height, width, 4))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                view[:, :, :3] = np.nan_to_num(rgb / weight[:, :, None]).astype(np.uint8)
+            view[:, :, 3] = np.where(opacity > 0, 60 + 195 * opacity, 0).astype(np.uint8)
+            p.image_rgba(
+                image=[image],
+                x=0,
+                y=y_range[0],
+                dw=max(values.shape[1] - 1, 1),
+                dh=(y_range[1] - y_range[0]) or 1.0,
+            )
+
+            bands = []
+            if quantile_bands:
+                for code in range(len(labels)):
+                    curves = values[bounds[code] : bounds[code + 1]]
+                    low, median, high = np.nanquantile(curves, [0.05, 0.5, 0.95], axis=0)
+                    bands.append(dict(x=x, low=low, median=median, high=high))
+
+                def decimate(item: dict, fraction: float) -> dict:
+                    pixels = max(int(len(item["x"]) * fraction / 4), 1)
+                    keep = m4_indices(item["x"], item["median"], pixels)
+                    return {key: band[keep] for key, band in item.items()}
+
+                bands = self.fit_to_budget(
+                    bands,
+                    decimate=decimate,
+                    rasterize=None,
+                    reserved_bytes=serialized_bytes(image),
+                )
+            renderers = []
+            for code, label in enumerate(labels):
+                if quantile_bands:
+                    source = ColumnDataSource(bands[code])
+                    p.varea(
+                        x="x",
+                        y1="low",
+                        y2="high",
+                        source=source,
+                        fill_color=colors[code],
+                        fill_alpha=0.15,
+                        legend_label=str(label),
+                    )
+                    renderers.append(
+                        p.line(
+                            x="x",
+                            y="median",
+                            source=source,
+                            color=colors[code],
+                            line_width=self.line_width * 2,
+                            line_dash="dashed",
+                            legend_label=str(label),
+                            name=str(label),
+                        )
+                    )
+                else:
+                    # Empty glyph, only for the legend entry
+                    p.line(x=[], y=[], color=colors[code], legend_label=str(label))
+
+            self.legend_settings(
+                legend_title=legend_title,
+                legend_clickable=True,
+                legend_location="top_left",
+                legend_orientation="vertical",
+            )
+            self.styling_figure(xaxis_padding=xaxis_padding)
+            self.figure.add_tools(
+                HoverTool(
+                    renderers=renderers,
+                    tooltips=[
+                        (legend_title, "$name"),
+                        ("X Value", "$x{1f}"),
+                        ("Median", "@median{1f}"),
+                        ("5%", "@low{1f}"),
+                        ("95%", "@high{1f}"),
+                    ],
+                )
+            )
+            self.display_figure()
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
@@ -202,12 +414,17 @@ class LinePlots(Visualization):
         xaxis_padding: float = 0.1,
         use_xaxis_Datetime: bool = False,
         format_for_xaxis: str = "",
+        downsample_width: int = None,
+        rolling_window: Any = None,
+        rolling_stats: Tuple[str, ...] = ("mean", "std"),
+        band_sigma: float = 2,
     ) -> None:
         """[summary]
 
         Arguments:
             df {pd.DataFrame} -- [Dataframe having category column, y-values column, x-values
-            column/Datetime column. For e.g.:
+            column/Datetime column (or any input accepted by 'read_frame', only these three
+            columns are read). For e.g.:
             Converting column in to Datetime format and then assigning to parameter x_values_clmn ]
             x_values_clmn {str} -- [Name of the x-value column (either number column or
             Datatime column). You can use below command for converting reqd column into datetime:
@@ -228,69 +445,531 @@ class LinePlots(Visualization):
             labels.
             For e.g.: "%Y-%m-%d  %H:%M:%S"
             ] (default: {""})
+            downsample_width {int} -- [If set, every category is M4-aggregated (first, last,
+            min and max point per pixel column) to this many pixel columns before plotting]
+            (default: {None})
+            rolling_window {Any} -- [If set, rolling statistics of every category are overlaid.
+            int: number of points; str/pd.Timedelta: time span such as "1h" (Datetime
+            x-values); float: span in x-units] (default: {None})
+            rolling_stats {Tuple[str, ...]} -- [Overlays to draw: "mean" (dashed line), "std"
+            (band of mean +/- band_sigma standard deviations), "min"/"max" (band between the
+            rolling minimum and maximum)] (default: {("mean", "std")})
+            band_sigma {float} -- [Half-width of the "std" band in standard deviations]
+            (default: {2})
 
         Returns:
             [None]
         """
         try:
-            palette = self.colors[: len(df[category_clmn].unique())]
+            df = read_frame(df, [x_values_clmn, y_value_clmn, category_clmn])
             p = self.figure
-            for category, color in zip(df[category_clmn].unique(), palette):
-                dfnew = df.loc[(df[category_clmn] == category)]
-                source = ColumnDataSource(
-                    dict(
-                        x_values=list(dfnew[x_values_clmn]),
-                        y_values=list(dfnew[y_value_clmn]),
-                        category_clmn=dfnew[category_clmn],
+            codes, labels = encode_categories(df[category_clmn])
+            order, bounds = partition(codes, len(labels))
+            colors = category_colors(self.colors, len(labels))
+            x_all = df[x_values_clmn].to_numpy()[order]
+            y_all = df[y_value_clmn].to_numpy()[order]
+            x_extent = (None, None)
+            if downsample_width:
+                # Pixel columns span the x-extent of all categories
+                x_numeric = to_numeric(x_all)
+                x_extent = (np.nanmin(x_numeric), np.nanmax(x_numeric))
+            series, overlays, overlay_series = [], [], []
+            for code, label in enumerate(labels):
+                rows = slice(bounds[code], bounds[code + 1])
+                x, y = x_all[rows], y_all[rows]
+                if downsample_width or rolling_window:
+                    sort = np.argsort(x, kind="stable")
+                    x, y = x[sort], y[sort]
+                if rolling_window:
+                    for kind, alpha, item in self.__rolling_overlays(
+                        x=x,
+                        y=y,
+                        rolling_window=rolling_window,
+                        rolling_stats=rolling_stats,
+                        band_sigma=band_sigma,
+                        downsample_width=downsample_width,
+                        x_extent=x_extent,
+                    ):
+                        overlays.append((code, kind, alpha))
+                        overlay_series.append(item)
+                if downsample_width:
+                    keep = m4_indices(to_numeric(x), y, downsample_width, *x_extent)
+                    x, y = x[keep], y[keep]
+                series.append(dict(x_values=x, y_values=y))
+            # The overlays count against the budget too (and are left out of an image)
+            series = self.fit_to_budget(
+                series + overlay_series,
+                decimate=self.__decimate_line,
+                rasterize=lambda series, width, height: series_image(
+                    series[: len(labels)], "x_values", "y_values", colors, width, height
+                ),
+            )
+            for (code, kind, alpha), item in zip(overlays, series[len(labels) :]):
+                if kind == "band":
+                    p.varea(
+                        x=item["x_values"],
+                        y1=item["y_values"],
+                        y2=item["high"],
+                        fill_color=colors[code],
+                        fill_alpha=alpha,
+                        legend_label=str(labels[code]),
+                    )
+                else:
+                    p.line(
+                        x=item["x_values"],
+                        y=item["y_values"],
+                        color=colors[code],
+                        line_dash="dashed",
+                        line_width=self.line_width,
+                        legend_label=str(labels[code]),
+                        name=str(labels[code]),
                     )
+            for code, label in enumerate(labels):
+                source = ColumnDataSource(series[code])
+                p.line(
+                    x="x_values",
+                    y="y_values",
+                    source=source,
+                    line_alpha=self.transparency,
+                    color=colors[code],
+                    line_width=self.line_width,
+                    legend_label=str(label),
+                    name=str(label),
                 )
+            self.__finish_timeseries_plot(
+                category_clmn=category_clmn,
+                y_value_clmn=y_value_clmn,
+                xlabel_orientation=xlabel_orientation,
+                xaxis_padding=xaxis_padding,
+                use_xaxis_Datetime=use_xaxis_Datetime,
+                format_for_xaxis=format_for_xaxis,
+            )
+            self.display_figure()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_timeseries_lod_plot(
+        self,
+        df: pd.DataFrame,
+        x_values_clmn: str,
+        y_value_clmn: str,
+        category_clmn: str,
+        doc: Document = None,
+        debounce_ms: int = 150,
+        server_hover: bool = False,
+        xlabel_orientation: float = 0.9,
+        xaxis_padding: float = 0.1,
+        use_xaxis_Datetime: bool = False,
+        format_for_xaxis: str = "",
+    ) -> None:
+        """[Server-backed variant of 'generate_timeseries_plot' with level-of-detail re-sampling:
+        whenever the visible x-range changes (debounced), the visible slice of every category is
+        found by binary search and M4-aggregated to the current pixel width, so zoom latency
+        depends on the screen width instead of the length of the series. Must run inside a
+        Bokeh server application, e.g.: bokeh serve app.py]
+
+        Arguments:
+            df {pd.DataFrame} -- [Dataframe having category column, y-values column, x-values
+            column/Datetime column, see 'generate_timeseries_plot']
+            x_values_clmn {str} -- [Name of the x-value column (number or Datetime column)]
+            y_value_clmn {str} -- [Name of the y-value column]
+            category_clmn {str} -- [Name of the category column]
+
+        Keyword Arguments:
+            doc {Document} -- [Document the plot is added to] (default: {curdoc()})
+            debounce_ms {int} -- [Waiting time after the last range change before the data is
+            re-sampled] (default: {150})
+            server_hover {bool} -- [Replace the hover tool by a server-side look-up of the
+            nearest full-resolution point, see 'enable_server_hover'] (default: {False})
+            xlabel_orientation {float} -- [Rotating x-labels to fit the plot] (default: {0.9})
+            xaxis_padding {float} -- [Padding for x-axis] (default: {0.1})
+            use_xaxis_Datetime {bool} -- [If x-value column is datetime, then 'True']
+            (default: {False})
+            format_for_xaxis {str} -- [If x-value column is datetime, mention format for x-axis
+            labels. For e.g.: "%Y-%m-%d  %H:%M:%S"] (default: {""})
+
+        Returns:
+            [None]
+        """
+        try:
+            df = read_frame(df, [x_values_clmn, y_value_clmn, category_clmn])
+            doc = doc or curdoc()
+            p = self.figure
+            series = []
+            codes, labels = encode_categories(df[category_clmn])
+            order, bounds = partition(codes, len(labels))
+            colors = category_colors(self.colors, len(labels))
+            x_all = to_numeric(df[x_values_clmn])[order]
+            y_all = df[y_value_clmn].to_numpy()[order]
+            for code, label in enumerate(labels):
+                rows = slice(bounds[code], bounds[code + 1])
+                sort = np.argsort(x_all[rows], kind="stable")
+                source = ColumnDataSource(dict(x_values=[], y_values=[]))
                 p.line(
                     x="x_values",
                     y="y_values",
                     source=source,
                     line_alpha=self.transparency,
-                    color=color,
+                    color=colors[code],
                     line_width=self.line_width,
-                    legend_group="category_clmn",
+                    legend_label=str(label),
+                    name=str(label),
                 )
-            self.styling_figure(
-                xlabel_orientation=xlabel_orientation if use_xaxis_Datetime else None,
+                # Full resolution data stays on the server
+                series.append((x_all[rows][sort], y_all[rows][sort], source))
+            x_start = min(x[0] for x, _, _ in series)
+            x_end = max(x[-1] for x, _, _ in series)
+
+            def resample() -> None:
+                start, end = p.x_range.start, p.x_range.end
+                width = p.inner_width or self.plt_width
+                for x, y, source in series:
+                    window = visible_slice(x, start, end)
+                    idx = m4_indices(x[window], y[window], width, start, end)
+                    source.data = dict(x_values=x[window][idx], y_values=y[window][idx])
+
+            self.__finish_timeseries_plot(
+                category_clmn=category_clmn,
+                y_value_clmn=y_value_clmn,
+                xlabel_orientation=xlabel_orientation,
                 xaxis_padding=xaxis_padding,
-                yaxis_notation=False,
+                use_xaxis_Datetime=use_xaxis_Datetime,
+                format_for_xaxis=format_for_xaxis,
             )
-            self.legend_settings(
-                legend_title=category_clmn,
-                legend_clickable=True,
-                legend_location="top_right",
-                legend_orientation="vertical",
+            self.__serve_resampled(
+                doc=doc,
+                resample=resample,
+                x_start=x_start,
+                x_end=x_end,
+                xaxis_padding=xaxis_padding,
+                debounce_ms=debounce_ms,
             )
-            p.add_tools(
-                HoverTool(
-                    tooltips=[
-                        # Formatting the x-axis tooltips in the provided format
-                        (category_clmn, "@category_clmn"),
-                        #  Below code sets the X-Value in given format
-                        (
-                            ("X Value",)
-                            + (
-                                ("$x{" + format_for_xaxis + "}",)
-                                if use_xaxis_Datetime
-                                else ("$x{1f}",)
-                            )
-                        ),
-                        (y_value_clmn, "$y{1f}"),
-                    ],
-                    #  Below code formats the above set X-Value
-                    formatters={"$x": "datetime"}
-                    if use_xaxis_Datetime
-                    else {"$x": "numeral"},
+            if server_hover:
+                self.enable_server_hover(
+                    df[x_values_clmn].to_numpy()[order],
+                    y_all,
+                    categories=codes[order],
+                    labels=labels,
+                    doc=doc,
                 )
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_timeseries_pyramid_plot(
+        self,
+        store: PyramidReader,
+        doc: Document = None,
+        debounce_ms: int = 150,
+        xlabel_orientation: float = 0.9,
+        xaxis_padding: float = 0.1,
+        format_for_xaxis: str = "",
+    ) -> None:
+        """[Server-backed time series plot reading from a min/max/mean pyramid written by
+        'PyramidStore.build_pyramid'. On every (debounced) x-range change, the level matching the
+        visible range and pixel width is picked and only the visible buckets are read from the
+        memory-mapped store. Each category is drawn as its mean line inside a min/max band.
+        Must run inside a Bokeh server application, e.g.: bokeh serve app.py]
+
+        Arguments:
+            store {PyramidReader} -- [Opened pyramid store (or the path of its folder)]
+
+        Keyword Arguments:
+            doc {Document} -- [Document the plot is added to] (default: {curdoc()})
+            debounce_ms {int} -- [Waiting time after the last range change before the data is
+            read again] (default: {150})
+            xlabel_orientation {float} -- [Rotating x-labels to fit the plot] (default: {0.9})
+            xaxis_padding {float} -- [Padding for x-axis] (default: {0.1})
+            format_for_xaxis {str} -- [If the store has datetime x-values, format for x-axis
+            labels. For e.g.: "%Y-%m-%d  %H:%M:%S"] (default: {""})
+
+        Returns:
+            [None]
+        """
+        try:
+            if not isinstance(store, PyramidReader):
+                store = PyramidReader(store)
+            doc = doc or curdoc()
+            p = self.figure
+            sources = []
+            colors = category_colors(self.colors, len(store.categories))
+            for category, color in zip(store.categories, colors):
+                source = ColumnDataSource(dict(x=[], ymin=[], ymax=[], ymean=[]))
+                p.varea(
+                    x="x",
+                    y1="ymin",
+                    y2="ymax",
+                    source=source,
+                    fill_color=color,
+                    fill_alpha=self.transparency * 0.3,
+                    legend_label=category,
+                )
+                p.line(
+                    x="x",
+                    y="ymean",
+                    source=source,
+                    line_alpha=self.transparency,
+                    color=color,
+                    line_width=self.line_width,
+                    legend_label=category,
+                    name=category,
+                )
+                sources.append((category, source))
+
+            def resample() -> None:
+                start, end = p.x_range.start, p.x_range.end
+                width = p.inner_width or self.plt_width
+                for category, source in sources:
+                    data = store.query(category, start, end, width)
+                    data.pop("level")
+                    source.data = data
+
+            self.__finish_timeseries_plot(
+                category_clmn=store.meta["category_clmn"],
+                y_value_clmn=store.meta["y_value_clmn"],
+                xlabel_orientation=xlabel_orientation,
+                xaxis_padding=xaxis_padding,
+                use_xaxis_Datetime=store.meta["datetime"],
+                format_for_xaxis=format_for_xaxis,
+            )
+            x_start, x_end = store.extent()
+            self.__serve_resampled(
+                doc=doc,
+                resample=resample,
+                x_start=x_start,
+                x_end=x_end,
+                xaxis_padding=xaxis_padding,
+                debounce_ms=debounce_ms,
             )
-            if use_xaxis_Datetime:
-                p.xaxis.formatter = DatetimeTickFormatter(days=[format_for_xaxis])
-            show(self.figure)
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
                 print(e)
+
+    def __serve_resampled(
+        self,
+        doc: Document,
+        resample: Callable[[], None],
+        x_start: float,
+        x_end: float,
+        xaxis_padding: float,
+        debounce_ms: int,
+    ) -> None:
+        """[Private method fixing the x-range to the data extent, running 'resample' now and on
+        every (debounced) x-range change, and adding the figure to the document]
+
+        Arguments:
+            doc {Document} -- [Document the figure is added to]
+            resample {Callable[[], None]} -- [Refills the sources for the current x-range]
+            x_start {float} -- [Smallest x-value of the data]
+            x_end {float} -- [Largest x-value of the data]
+            xaxis_padding {float} -- [Padding for x-axis]
+            debounce_ms {int} -- [Waiting time after the last range change]
+        """
+        p = self.figure
+        # Explicit range: an auto-range would shrink to the re-sampled window on reset
+        padding = (x_end - x_start) * xaxis_padding / 2
+        p.x_range = Range1d(x_start - padding, x_end + padding)
+        resample()
+        trigger = debounce(doc, resample, debounce_ms)
+        p.x_range.on_change("start", trigger)
+        p.x_range.on_change("end", trigger)
+        doc.add_root(p)
+
+    def __rolling_overlays(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        rolling_window: Any,
+        rolling_stats: Tuple[str, ...],
+        band_sigma: float,
+        downsample_width: int,
+        x_extent: Tuple[float, float],
+    ) -> List[Tuple[str, float, dict]]:
+        """[Private method computing the rolling statistics of one sorted series. Overlays are
+        computed at full resolution and then reduced to the same pixel width as the series]
+
+        Arguments:
+            x {np.ndarray} -- [x-values, sorted ascending]
+            y {np.ndarray} -- [y-values]
+            rolling_window {Any} -- [Window, see 'Rolling.window_starts']
+            rolling_stats {Tuple[str, ...]} -- [Any of "mean", "std", "min", "max"]
+            band_sigma {float} -- [Half-width of the "std" band in standard deviations]
+            downsample_width {int} -- [Number of pixel columns, None for no reduction]
+            x_extent {Tuple[float, float]} -- [x-range the pixel columns span]
+
+        Returns:
+            List[Tuple[str, float, dict]] -- [Kind ("band" or "mean"), fill alpha and series
+            ('x_values', 'y_values' and, for bands, 'high') of every overlay]
+        """
+        x_numeric = to_numeric(x)
+        starts = window_starts(x, rolling_window)
+        overlays = []
+        bands = []
+        mean, std = rolling_mean_std(y, starts)
+        if "std" in rolling_stats:
+            bands.append((mean - band_sigma * std, mean + band_sigma * std, 0.2))
+        if "min" in rolling_stats or "max" in rolling_stats:
+            low, high = rolling_min_max(y, starts)
+            bands.append((low, high, 0.1))
+        for low, high, alpha in bands:
+            band_x = x_numeric
+            if downsample_width:
+                band_x, low, high = envelope(
+                    x_numeric, low, high, downsample_width, *x_extent
+                )
+            overlays.append(("band", alpha, dict(x_values=band_x, y_values=low, high=high)))
+        if "mean" in rolling_stats:
+            keep = slice(None)
+            if downsample_width:
+                keep = m4_indices(x_numeric, mean, downsample_width, *x_extent)
+            overlays.append(("mean", 1.0, dict(x_values=x_numeric[keep], y_values=mean[keep])))
+        return overlays
+
+    def __decimate_line(self, series: dict, fraction: float) -> dict:
+        """[Private method decimating one series of a time series plot to about 'fraction' of
+        its points with M4 (up to four points per pixel column), see 'fit_to_budget']
+
+        Arguments:
+            series {dict} -- [Series with 'x_values' and 'y_values']
+            fraction {float} -- [Fraction of the points to keep]
+
+        Returns:
+            dict -- [Decimated series, sorted by x]
+        """
+        x = to_numeric(series["x_values"])
+        sort = np.argsort(x, kind="stable")
+        width = max(int(len(x) * fraction / 4), 1)
+        keep = sort[m4_indices(x[sort], series["y_values"][sort], width)]
+        return {key: values[keep] for key, values in series.items()}
+
+    def __decimate_curves(self, series: dict, fraction: float) -> dict:
+        """[Private method decimating the curves of one category (rows of 'y' and 'x', with
+        increasing x) to about 'fraction' of their points with M4, see 'fit_to_budget'. Curves
+        sampled at x = 0, 1, ... are reduced in one pass; curves with irregular x (e.g. already
+        M4-aggregated by 'target_width') are bucketed by their x-values, one curve at a time]
+
+        Arguments:
+            series {dict} -- [Series with 'x' and 'y' of shape (n_curves, n_points)]
+            fraction {float} -- [Fraction of the points to keep]
+
+        Returns:
+            dict -- [Decimated series]
+        """
+        y_all, x_all = np.asarray(series["y"]), np.asarray(series["x"])
+        n_curves, n_points = y_all.shape
+        width = max(int(n_points * fraction / 4), 1)
+        regular = np.broadcast_to(np.arange(n_points), x_all.shape)
+        if not n_curves or np.array_equal(x_all, regular):
+            positions = m4_columns(y_all.astype(np.float64, copy=False).T, width).T
+        else:
+            # Same pixel columns for all curves. Curves keeping fewer points repeat their last
+            # one, which draws nothing, so the kept points still form one (n_curves, k) block
+            x_numeric = to_numeric(x_all)
+            extent = (np.nanmin(x_numeric), np.nanmax(x_numeric))
+            kept = [
+                m4_indices(x_numeric[curve], y_all[curve], width, *extent)
+                for curve in range(n_curves)
+            ]
+            length = max(len(keep) for keep in kept)
+            positions = np.stack(
+                [np.pad(keep, (0, length - len(keep)), mode="edge") for keep in kept]
+            )
+        y = np.take_along_axis(y_all, positions, axis=1)
+        x = np.take_along_axis(x_all, positions, axis=1)
+        return dict(y=y, x=x)
+
+    def __rasterize_curves(self, series: list, colors: list, width: int, height: int) -> Tuple:
+        """[Private method drawing the curves of all categories as one image, see
+        'Binning.rasterize_lines' and 'Binning.category_image']
+
+        Arguments:
+            series {list} -- [Series with 'x' and 'y' of shape (n_curves, n_points), per category]
+            colors {list} -- [Colour per category]
+            width {int} -- [Image width in pixels]
+            height {int} -- [Image height in pixels]
+
+        Returns:
+            Tuple -- [Image, x, y, dw and dh for 'image_rgba']
+        """
+        n_points = max(item["y"].shape[1] for item in series)
+        y_low = min(np.nanmin(item["y"]) for item in series if item["y"].size)
+        y_high = max(np.nanmax(item["y"]) for item in series if item["y"].size)
+        y_range = (y_low, y_high) if y_high > y_low else (y_low - 0.5, y_low + 0.5)
+        grids = (
+            (code, rasterize_lines(item["y"], width, height, y_range))
+            for code, item in enumerate(series)
+            if len(item["y"])
+        )
+        image = category_image(grids, colors)
+        return image, 0, y_range[0], max(n_points - 1, 1), y_range[1] - y_range[0]
+
+    def __finish_timeseries_plot(
+        self,
+        category_clmn: str,
+        y_value_clmn: str,
+        xlabel_orientation: float,
+        xaxis_padding: float,
+        use_xaxis_Datetime: bool,
+        format_for_xaxis: str,
+    ) -> None:
+        """[Private method styling the time series figure and adding the legend and hover tool]
+
+        Arguments:
+            category_clmn {str} -- [Name of the category column]
+            y_value_clmn {str} -- [Name of the y-value column]
+            xlabel_orientation {float} -- [Rotating x-labels to fit the plot]
+            xaxis_padding {float} -- [Padding for x-axis]
+            use_xaxis_Datetime {bool} -- [If x-value column is datetime, then 'True']
+            format_for_xaxis {str} -- [Format for the Datetime x-axis labels]
+        """
+        p = self.figure
+        self.styling_figure(
+            xlabel_orientation=xlabel_orientation
+            if use_xaxis_Datetime
+            else "horizontal",
+            xaxis_padding=xaxis_padding,
+            yaxis_notation=False,
+        )
+        self.legend_settings(
+            legend_title=category_clmn,
+            legend_clickable=True,
+            legend_location="top_right",
+            legend_orientation="vertical",
+        )
+        p.add_tools(
+            HoverTool(
+                tooltips=[
+                    # Formatting the x-axis tooltips in the provided format
+                    (category_clmn, "$name"),
+                    #  Below code sets the X-Value in given format
+                    (
+                        ("X Value",)
+                        + (
+                            ("$x{" + format_for_xaxis + "}",)
+                            if use_xaxis_Datetime
+                            else ("$x{1f}",)
+                        )
+                    ),
+                    (y_value_clmn, "$y{1f}"),
+                ],
+                #  Below code formats the above set X-Value
+                formatters={"$x": "datetime"}
+                if use_xaxis_Datetime
+                else {"$x": "numeral"},
+            )
+        )
+        if use_xaxis_Datetime:
+            p.xaxis.formatter = DatetimeTickFormatter(days=[format_for_xaxis])
@@ -2,22 +2,30 @@ from bokeh.plotting import show, output_file
 import holoviews as hv
 import numpy as np
 from functools import reduce
-from typing import List, Tuple
+from typing import Any, List, Tuple
 import cv2
 from pathlib import Path
+from ImageSources import load_image
 
 hv.extension("bokeh")
 
 
 class PicturePlots:
+    # When False, the rendered figure is returned (and kept in 'self.figure') instead of shown
+    auto_show = True
+    # When True, errors are raised instead of printed
+    raise_errors = False
+
     def __scaling_images(
         self,
         img,  # Image object
         max_width: int,  # Maximum Width pixels
         max_height: int,  # Maximum Height pixels,
+        archives: dict = None,  # Archives opened so far, by path
     ) -> Tuple[hv.RGB, float]:
-        img = cv2.imread(img)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = load_image(img, archives)
+        if img.ndim == 3 and img.shape[2] == 1:
+            img = img[:, :, 0]
         RGB_flag = 0
         if len(img.shape) == 3:
             RGB_flag = 1
@@ -25,14 +33,19 @@ class PicturePlots:
             print(img.shape)
         # Aspect Ratio Before width/height
         aspect = img.shape[1] / img.shape[0]
-        width_factor = int((max_width / img.shape[1]) * 100)
-        height_factor = int((max_height / img.shape[0]) * 100)
-        factor = width_factor if width_factor < height_factor else height_factor
-        new_width = int(img.shape[1] * factor / 100)
-        new_height = int(img.shape[0] * factor / 100)
-        dim = (new_width, new_height)
-        # Resizing image
-        resized = cv2.resize(img, dim, interpolation=cv2.INTER_AREA)
+        # Resizing image, only down: an image that already fits is used as it is (no copy)
+        if img.shape[1] <= max_width and img.shape[0] <= max_height:
+            resized = img
+        else:
+            width_factor = int((max_width / img.shape[1]) * 100)
+            height_factor = int((max_height / img.shape[0]) * 100)
+            factor = width_factor if width_factor < height_factor else height_factor
+            new_width = max(int(img.shape[1] * factor / 100), 1)
+            new_height = max(int(img.shape[0] * factor / 100), 1)
+            dim = (new_width, new_height)
+            resized = cv2.resize(
+                np.ascontiguousarray(img), dim, interpolation=cv2.INTER_AREA
+            )
         if RGB_flag == 0:
             new_img = np.stack((resized, resized, resized), axis=2)
         elif RGB_flag == 1:
@@ -43,7 +56,7 @@ class PicturePlots:
 
     def generate_picture_plot(
         self,
-        images: List[str],
+        images: List[Any],
         labels: List[str] = [],
         use_original_aspect: bool = True,
         plot_title: str = "Picture Plot",
@@ -54,23 +67,30 @@ class PicturePlots:
     ) -> hv.render:
         """
         Arguments:
-            images {List[images]} -- [Relative or Absolute path of the Image]
+            images {List[images]} -- [Relative or Absolute path of the Image, NumPy array (RGB(A)
+            or grayscale, used without a copy when it fits the maximum size), encoded image bytes or
+            'ImageSources.ArchiveMember' (read from the memory-mapped zip/tar archive, which is
+            opened once per call)]
             labels {List[labels]} -- [It refers to title of the individual plot to be displayed]
 
         Keyword Arguments:
             use_original_aspect {bool} -- [Original aspect ratio is used to plot otherwise default
             when False] (default: {True})
             plot_title {str} -- [Title of the plot] (default: {"Picture Plot"})
-            max_height_pixels {int} -- [Maximum Height pixels, for Scaling image] (default: {1600})
-            max_width_pixels {int} -- [Maximum Width pixels, for Scaling image] (default: {2200})
+            max_height_pixels {int} -- [Maximum Height pixels, larger images are scaled down,
+            smaller ones are not scaled up] (default: {1600})
+            max_width_pixels {int} -- [Maximum Width pixels, larger images are scaled down,
+            smaller ones are not scaled up] (default: {2200})
             output_file_path {str} -- [Path of the output file which you want to keep (if not
             provided, store in current folder with the 'filename' provided))
             output_file_name {str} -- [Name of the output file which you want to keep
             (without .html)] (default: {None})
 
         Returns:
-            hv.render -- [Render object which shows Holoviews Layout plot]
+            hv.render -- [Render object which shows Holoviews Layout plot; the rendered figure
+            itself when 'auto_show' is False]
         """
+        archives = {}
         try:
             if output_file_name != "":
                 if output_file_path == "":
@@ -86,11 +106,16 @@ class PicturePlots:
             lst_img = []
             Aspect = None
 
+            # Copy, so the (shared) default list is not extended between calls
+            labels = list(labels)
             for i in range(len(images) - len(labels)):
                 labels.append("Plot")
             for img, name in zip(images, labels):
                 new_img, Aspect = self.__scaling_images(
-                    img=img, max_height=max_height_pixels, max_width=max_width_pixels
+                    img=img,
+                    max_height=max_height_pixels,
+                    max_width=max_width_pixels,
+                    archives=archives,
                 )
                 lst_img.append(
                     hv.RGB(new_img, label=name).opts(
@@ -110,7 +135,7 @@ class PicturePlots:
                 )
             if len(lst_img) == 1:
                 # Displaying only 1 image
-                return show(hv.render(lst_img[0]))
+                self.figure = hv.render(lst_img[0])
             else:
                 plot = (
                     # Adds the Images to the Holoviews frame (e.g.: Original + Label + Predicted )
@@ -121,12 +146,20 @@ class PicturePlots:
                     title=plot_title,
                     fontsize={"title": "20pt"},
                 )
-                return show(hv.render(plot))
+                self.figure = hv.render(plot)
+            if self.auto_show:
+                return show(self.figure)
+            return self.figure
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
                 print(e)
+        finally:
+            for archive in archives.values():
+                archive.close()
 
 
 if __name__ == "__main__":
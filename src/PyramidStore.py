@@ -0,0 +1,168 @@
+import json
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+from Downsampling import to_numeric, visible_slice
+from DataSources import read_frame
+
+# On-disk min/max/mean pyramid of a long-format time series (category, x-values, y-values).
+# Level 0 holds the sorted raw points of a category, level k holds buckets of 2**k points.
+# Every level is stored as .npy files and opened memory-mapped, so only the pages of the
+# requested window are read.
+
+FIELDS = ("x", "ymin", "ymax", "ymean")
+
+
+def _halve(
+    x: np.ndarray, ymin: np.ndarray, ymax: np.ndarray, ysum: np.ndarray, count: np.ndarray
+) -> Tuple[np.ndarray, ...]:
+    """[Merges neighbouring buckets pairwise, giving the next level of the pyramid]"""
+    if len(x) % 2:
+        # Pad with an empty copy of the last bucket
+        x, ymin, ymax = (np.r_[a, a[-1:]] for a in (x, ymin, ymax))
+        ysum, count = np.r_[ysum, 0], np.r_[count, 0]
+    return (
+        x[0::2],
+        np.fmin(ymin[0::2], ymin[1::2]),
+        np.fmax(ymax[0::2], ymax[1::2]),
+        ysum[0::2] + ysum[1::2],
+        count[0::2] + count[1::2],
+    )
+
+
+def build_pyramid(
+    df: pd.DataFrame,
+    x_values_clmn: str,
+    y_value_clmn: str,
+    category_clmn: str,
+    directory: str,
+    min_buckets: int = 1024,
+) -> None:
+    """[Builds the min/max/mean pyramid of every category and stores it in 'directory']
+
+    Arguments:
+        df {pd.DataFrame} -- [Dataframe having category column, y-values column, x-values
+        column/Datetime column, as used by 'LinePlots.generate_timeseries_plot' (or any input
+        accepted by 'read_frame')]
+        x_values_clmn {str} -- [Name of the x-value column (number or Datetime column)]
+        y_value_clmn {str} -- [Name of the y-value column]
+        category_clmn {str} -- [Name of the category column]
+        directory {str} -- [Folder of the store, created if missing]
+
+    Keyword Arguments:
+        min_buckets {int} -- [No further level is built once a level has at most this many
+        buckets] (default: {1024})
+    """
+    df = read_frame(df, [x_values_clmn, y_value_clmn, category_clmn])
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    meta = dict(
+        x_values_clmn=x_values_clmn,
+        y_value_clmn=y_value_clmn,
+        category_clmn=category_clmn,
+        datetime=bool(pd.api.types.is_datetime64_any_dtype(df[x_values_clmn])),
+        categories=[],
+    )
+    for number, (category, dfnew) in enumerate(df.groupby(category_clmn, sort=False)):
+        dfnew = dfnew.sort_values(x_values_clmn, kind="stable")
+        folder = root / "c{}".format(number)
+        folder.mkdir(exist_ok=True)
+        x = to_numeric(dfnew[x_values_clmn])
+        y = dfnew[y_value_clmn].to_numpy(dtype=np.float64)
+        np.save(folder / "level0_x.npy", x)
+        np.save(folder / "level0_y.npy", y)
+        valid = ~np.isnan(y)
+        level = (x, y, y, np.where(valid, y, 0.0), valid.astype(np.int64))
+        levels = 1
+        while len(level[0]) > min_buckets:
+            level = _halve(*level)
+            x_, ymin, ymax, ysum, count = level
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ymean = ysum / count
+            for field, values in zip(FIELDS, (x_, ymin, ymax, ymean)):
+                np.save(folder / "level{}_{}.npy".format(levels, field), values)
+            levels += 1
+        meta["categories"].append(
+            dict(
+                label=str(category),
+                folder=folder.name,
+                levels=levels,
+                length=len(x),
+                x_start=float(x[0]),
+                x_end=float(x[-1]),
+            )
+        )
+    with open(root / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+class PyramidReader:
+    def __init__(self, directory: str) -> None:
+        """[Opens a store written by 'build_pyramid'. Arrays are memory-mapped on first use]
+
+        Arguments:
+            directory {str} -- [Folder of the store]
+        """
+        self.root = Path(directory)
+        with open(self.root / "meta.json") as f:
+            self.meta = json.load(f)
+        self.__entries = {entry["label"]: entry for entry in self.meta["categories"]}
+        self.__arrays = {}
+
+    @property
+    def categories(self) -> List[str]:
+        """[Labels of the stored categories]"""
+        return [entry["label"] for entry in self.meta["categories"]]
+
+    def extent(self) -> Tuple[float, float]:
+        """[Smallest and largest x-value over all categories]"""
+        return (
+            min(entry["x_start"] for entry in self.meta["categories"]),
+            max(entry["x_end"] for entry in self.meta["categories"]),
+        )
+
+    def __array(self, category: str, level: int, field: str) -> np.ndarray:
+        """[Private method returning (and caching) one memory-mapped array of the store]"""
+        key = (category, level, field)
+        if key not in self.__arrays:
+            if level == 0:
+                # Raw points: min, max and mean are all the y-values
+                name = "level0_{}.npy".format("x" if field == "x" else "y")
+            else:
+                name = "level{}_{}.npy".format(level, field)
+            self.__arrays[key] = np.load(
+                self.root / self.__entries[category]["folder"] / name, mmap_mode="r"
+            )
+        return self.__arrays[key]
+
+    def query(self, category: str, x_start: float, x_end: float, width: int) -> dict:
+        """[Returns the buckets of 'category' between 'x_start' and 'x_end', taken from the
+        finest level that has at most two buckets per pixel column]
+
+        Arguments:
+            category {str} -- [Label of the category]
+            x_start {float} -- [Left end of the visible range]
+            x_end {float} -- [Right end of the visible range]
+            width {int} -- [Number of pixel columns]
+
+        Returns:
+            dict -- [x, ymin, ymax and ymean arrays of the visible buckets, plus the level]
+        """
+        raw = visible_slice(self.__array(category, 0, "x"), x_start, x_end)
+        points = raw.stop - raw.start
+        level = 0
+        if points > 2 * width:
+            level = int(np.ceil(np.log2(points / (2 * width))))
+            level = min(level, self.__entries[category]["levels"] - 1)
+        window = (
+            raw
+            if level == 0
+            else visible_slice(self.__array(category, level, "x"), x_start, x_end)
+        )
+        data = {
+            field: np.asarray(self.__array(category, level, field)[window])
+            for field in FIELDS
+        }
+        data["level"] = level
+        return data
@@ -0,0 +1,419 @@
+import argparse
+import inspect
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Optional
+import pandas as pd
+from bokeh.embed import file_html
+from bokeh.layouts import column
+from bokeh.models import FactorRange, Panel, Tabs
+from bokeh.resources import CDN
+from DataSources import read_frame
+from Categories import to_categorical
+from LinePlots import LinePlots
+from ScatterPlots import ScatterPlots
+from StatisticsPlots import StatisticsPlots
+
+try:
+    import yaml
+except ImportError:  # Only needed for YAML specs
+    yaml = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for Parquet datasets
+    pq = None
+
+# Builds a multi-tab HTML report from a declarative JSON/YAML spec, e.g.:
+#
+# {
+#     "title": "Sales report",
+#     "output": "report.html",
+#     "datasets": {
+#         "sales": {"path": "sales.csv", "read_kwargs": {"parse_dates": ["date"]}}
+#     },
+#     "aggregates": {
+#         "by_region": {"from": "sales", "groupby": ["region"], "agg": {"amount": "sum"}}
+#     },
+#     "plots": [
+#         {"name": "Amount over time", "tab": "Overview", "class": "LinePlots",
+#          "method": "generate_timeseries_plot", "dataset": "sales",
+#          "columns": ["date", "amount", "region"],
+#          "init": {"plot_title": "Amount"},
+#          "args": {"x_values_clmn": "date", "y_value_clmn": "amount",
+#                   "category_clmn": "region", "use_xaxis_Datetime": true}}
+#     ]
+# }
+#
+# Datasets, aggregates and plots form a dependency graph. Every dataset is read once. When all
+# its plots list their "columns" (and its aggregates name theirs through "groupby"/"agg" or
+# "columns"), only those columns are read, otherwise the whole table; columns missing from the
+# file are left out of the read and only fail the plots naming them. Category columns are
+# converted to 'pd.Categorical' once, so every plot grouping by them shares the same integer
+# codes (each plot still sorts its rows by these codes itself). Aggregates are computed once and
+# shared by all plots using them. Nodes whose dependencies are done run in parallel on a thread
+# pool (threads share the loaded tables without copying). The categorical plots of
+# 'StatisticsPlots' get a 'FactorRange' x-range unless "init" gives an "x_range".
+
+PLOT_CLASSES = {
+    "LinePlots": LinePlots,
+    "ScatterPlots": ScatterPlots,
+    "StatisticsPlots": StatisticsPlots,
+}
+
+# Methods drawing on a categorical x-axis, the figure needs a 'FactorRange' (filled by the method)
+FACTOR_RANGE_METHODS = {
+    "generate_bar_chart",
+    "generate_stacked_bar_chart",
+    "generate_top_k_bar_chart",
+    "generate_top_k_stacked_bar_chart",
+    "generate_box_plot",
+    "generate_violin_plot",
+}
+
+
+def load_spec(path: str) -> dict:
+    """[Reads a report spec from a JSON or YAML (.yaml/.yml) file]
+
+    Arguments:
+        path {str} -- [Path of the spec]
+
+    Returns:
+        dict -- [Spec]
+    """
+    with open(path) as spec_file:
+        if Path(path).suffix.lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ImportError("YAML specs require 'pyyaml'")
+            return yaml.safe_load(spec_file)
+        return json.load(spec_file)
+
+
+def _named_columns(args: dict, keys: Optional[List[str]] = None) -> List[str]:
+    """[Column names given in the plot arguments whose name mentions a column ("..._clmn",
+    "..._column", "column_names", ...); only arguments containing one of 'keys' when given]"""
+    columns = []
+    for key, value in args.items():
+        if "clmn" not in key and "column" not in key:
+            continue
+        if keys is not None and not any(part in key for part in keys):
+            continue
+        for name in value if isinstance(value, list) else [value]:
+            if isinstance(name, str) and name not in columns:
+                columns.append(name)
+    return columns
+
+
+class ReportRunner:
+    def __init__(self, spec: dict, base_dir: str = ".", max_workers: int = 4) -> None:
+        """[Prepares the dependency graph of a report spec (see the top of the module)]
+
+        Arguments:
+            spec {dict} -- [Report spec]
+
+        Keyword Arguments:
+            base_dir {str} -- [Folder relative dataset paths start from] (default: {"."})
+            max_workers {int} -- [Number of nodes run at the same time] (default: {4})
+        """
+        self.spec = spec
+        self.base_dir = Path(base_dir)
+        self.max_workers = max_workers
+        self.results = {}
+        self.timings = []
+        # Nodes that failed or were skipped because a dependency failed, in that order
+        self.failed = []
+        self.nodes = {}
+        datasets = spec.get("datasets", {})
+        aggregates = spec.get("aggregates", {})
+        plots = spec.get("plots", [])
+        # Columns and category columns every source has to provide
+        needed = {name: [] for name in list(datasets) + list(aggregates)}
+        categories = {name: [] for name in needed}
+        read_all = set()
+
+        def require(source: str, columns: Optional[List[str]], category_columns=()) -> None:
+            if source not in needed:
+                raise ValueError("Unknown dataset or aggregate '{}'".format(source))
+            if columns is None:
+                read_all.add(source)
+                return
+            needed[source] += [col for col in columns if col not in needed[source]]
+            categories[source] += [
+                col for col in category_columns if col not in categories[source]
+            ]
+
+        for plot in plots:
+            if plot.get("dataset") is None:
+                continue
+            args = plot.get("args", {})
+            # Without an explicit list, the arguments do not tell all the columns a plot reads
+            # (e.g. every curve column of 'generate_multiline_plot_by_rows'): read everything
+            require(
+                plot["dataset"],
+                plot.get("columns"),
+                _named_columns(args, ["category", "stack"]),
+            )
+        # Aggregates are listed after the aggregates they are built from, so walking them
+        # backwards passes the needed columns down chains of aggregates
+        for name in reversed(list(aggregates)):
+            aggregate = aggregates[name]
+            if name in read_all:
+                columns = None
+            elif "columns" in aggregate or (
+                isinstance(aggregate.get("agg"), dict) and not aggregate.get("query")
+            ):
+                columns = list(aggregate.get("groupby", [])) + list(aggregate.get("agg", {}))
+                columns += aggregate.get("columns", [])
+            else:
+                # An aggregation of all columns or a query: the columns are not known
+                columns = None
+            require(aggregate["from"], columns, aggregate.get("groupby", []))
+
+        for name, dataset in datasets.items():
+            self.__add_node(
+                "dataset:" + name,
+                [],
+                self.__load_dataset,
+                name,
+                dataset,
+                None if name in read_all else needed[name],
+                categories[name],
+            )
+        for name, aggregate in aggregates.items():
+            self.__add_node(
+                "aggregate:" + name,
+                [self.__node_name(aggregate["from"])],
+                self.__aggregate,
+                name,
+                aggregate,
+            )
+        for index, plot in enumerate(plots):
+            dependencies = [] if plot.get("dataset") is None else [
+                self.__node_name(plot["dataset"])
+            ]
+            self.__add_node(
+                "plot:{}".format(index), dependencies, self.__render_plot, index, plot
+            )
+
+    def __node_name(self, source: str) -> str:
+        """[Private method giving the graph node of a dataset or aggregate]"""
+        if source in self.spec.get("aggregates", {}):
+            return "aggregate:" + source
+        return "dataset:" + source
+
+    def __add_node(self, name: str, dependencies: List[str], function, *args) -> None:
+        """[Private method adding a node to the dependency graph]"""
+        self.nodes[name] = dict(dependencies=dependencies, function=function, args=args)
+
+    def __load_dataset(
+        self, name: str, dataset: dict, columns: Optional[List[str]], category_columns
+    ) -> pd.DataFrame:
+        """[Private method reading a dataset once, with only the needed columns. Needed columns
+        the file does not have are skipped here, the plots naming them fail on their own]"""
+        path = self.base_dir / dataset["path"]
+        read_kwargs = dict(dataset.get("read_kwargs", {}))
+        if path.suffix.lower() == ".parquet":
+            if columns is not None and pq is not None:
+                names = set(pq.read_schema(str(path)).names)
+                columns = [col for col in columns if col in names]
+            df = read_frame(str(path), columns)
+        else:
+            if columns is not None:
+                parse_dates = read_kwargs.get("parse_dates")
+                if isinstance(parse_dates, list):
+                    columns = columns + [col for col in parse_dates if col not in columns]
+                wanted = set(columns)
+                read_kwargs["usecols"] = lambda col: col in wanted
+            df = pd.read_csv(path, **read_kwargs)
+        category_columns = [
+            col for col in category_columns if col in df.columns and df[col].dtype == object
+        ]
+        return to_categorical(df, category_columns) if category_columns else df
+
+    def __aggregate(self, name: str, aggregate: dict) -> pd.DataFrame:
+        """[Private method computing an aggregate once for all plots using it]"""
+        df = self.results[self.__node_name(aggregate["from"])]
+        if aggregate.get("query"):
+            df = df.query(aggregate["query"])
+        if aggregate.get("groupby"):
+            df = df.groupby(aggregate["groupby"], observed=True, sort=False).agg(
+                aggregate.get("agg", "sum")
+            )
+            df = df.reset_index()
+        return df
+
+    def __render_plot(self, index: int, plot: dict):
+        """[Private method building the figure of one plot, without showing it. Raises if a
+        column the plot names is missing or the plot method fails]"""
+        plot_class = PLOT_CLASSES[plot["class"]]
+        init = dict(plot.get("init", {}))
+        if plot["method"] in FACTOR_RANGE_METHODS and "x_range" not in init:
+            init["x_range"] = FactorRange()
+        instance = plot_class(**init)
+        instance.auto_show = False
+        instance.raise_errors = True
+        method = getattr(instance, plot["method"])
+        args = dict(plot.get("args", {}))
+        if plot.get("dataset") is not None:
+            df = self.results[self.__node_name(plot["dataset"])]
+            named = dict.fromkeys(plot.get("columns", []) + _named_columns(args))
+            missing = [col for col in named if col not in df.columns]
+            if missing:
+                raise ValueError(
+                    "Unknown column(s) {} in '{}'".format(", ".join(missing), plot["dataset"])
+                )
+            parameters = inspect.signature(method).parameters
+            data_argument = plot.get(
+                "data_argument", "df" if "df" in parameters else "data"
+            )
+            args[data_argument] = df
+        method(**args)
+        return instance.figure
+
+    def run(self) -> Tabs:
+        """[Runs the dependency graph and lays the figures out in tabs (plots sharing the same
+        "tab" are stacked in one tab, in spec order). Nodes that fail are reported and their
+        dependents skipped]
+
+        Returns:
+            Tabs -- [Report layout]
+        """
+        start = time.perf_counter()
+        pending = dict(self.nodes)
+        failed = set()
+        self.failed = []
+        running = {}
+
+        def execute(name: str):
+            node = self.nodes[name]
+            begin = time.perf_counter()
+            result = node["function"](*node["args"])
+            self.timings.append(
+                dict(
+                    node=name,
+                    start=begin - start,
+                    seconds=time.perf_counter() - begin,
+                    thread=threading.current_thread().name,
+                )
+            )
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    dependencies = pending[name]["dependencies"]
+                    if any(dependency in failed for dependency in dependencies):
+                        print("Skipped {}: a dependency failed".format(name))
+                        failed.add(name)
+                        self.failed.append(name)
+                        del pending[name]
+                    elif all(dependency in self.results for dependency in dependencies):
+                        running[executor.submit(execute, name)] = name
+                        del pending[name]
+                if not running:
+                    raise ValueError(
+                        "Circular dependency between: {}".format(", ".join(pending))
+                    )
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as e:
+                        print("{} failed: {}".format(name, e))
+                        failed.add(name)
+                        self.failed.append(name)
+        self.wall_seconds = time.perf_counter() - start
+
+        tabs = {}
+        for index, plot in enumerate(self.spec.get("plots", [])):
+            figure = self.results.get("plot:{}".format(index))
+            if figure is not None:
+                tab = plot.get("tab", plot.get("name", "Plot {}".format(index + 1)))
+                tabs.setdefault(tab, []).append(figure)
+        return Tabs(
+            tabs=[Panel(child=column(*figures), title=tab) for tab, figures in tabs.items()]
+        )
+
+    def timing_report(self) -> str:
+        """[Table of the nodes in start order with start time, duration and thread, followed by
+        the wall time and the summed node time]
+
+        Returns:
+            str -- [Report text]
+        """
+        names = {
+            "plot:{}".format(index): plot.get("name", plot["method"])
+            for index, plot in enumerate(self.spec.get("plots", []))
+        }
+        lines = ["{:<50} {:>9} {:>9}  {}".format("node", "start s", "time s", "thread")]
+        for timing in sorted(self.timings, key=lambda timing: timing["start"]):
+            label = timing["node"]
+            if label in names:
+                label += " ({})".format(names[label])
+            lines.append(
+                "{:<50} {:>9.3f} {:>9.3f}  {}".format(
+                    label[:50], timing["start"], timing["seconds"], timing["thread"]
+                )
+            )
+        lines.append(
+            "wall time {:.3f} s, summed node time {:.3f} s".format(
+                self.wall_seconds, sum(timing["seconds"] for timing in self.timings)
+            )
+        )
+        return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """[Command line entry point: python ReportRunner.py spec.json [-o report.html]]
+
+    Keyword Arguments:
+        argv {List[str]} -- [Command line arguments] (default: {sys.argv[1:]})
+
+    Returns:
+        int -- [Exit status: 0 if every node succeeded, 1 if the report could not be built or
+        any dataset, aggregate or plot failed (the report is still written without them)]
+    """
+    parser = argparse.ArgumentParser(description="Builds a multi-tab HTML report from a spec")
+    parser.add_argument("spec", help="JSON or YAML report spec")
+    parser.add_argument("-o", "--output", help="HTML file (default: 'output' of the spec)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="parallel nodes")
+    parser.add_argument("--timings", help="also write the timings as JSON to this file")
+    arguments = parser.parse_args(argv)
+    try:
+        spec = load_spec(arguments.spec)
+        runner = ReportRunner(
+            spec, base_dir=Path(arguments.spec).parent, max_workers=arguments.workers
+        )
+        layout = runner.run()
+        output = arguments.output or spec.get("output", "report.html")
+        title = spec.get("title", "Report")
+        with open(output, "w") as html_file:
+            html_file.write(file_html(layout, CDN, title=title))
+        print(runner.timing_report())
+        if arguments.timings:
+            with open(arguments.timings, "w") as timings_file:
+                json.dump(
+                    dict(wall_seconds=runner.wall_seconds, nodes=runner.timings),
+                    timings_file,
+                    indent=2,
+                )
+        print("Report written to {}".format(output))
+        if runner.failed:
+            print("{} node(s) failed: {}".format(len(runner.failed), ", ".join(runner.failed)))
+            return 1
+        return 0
+    except Exception as e:
+        if hasattr(e, "message"):
+            print(e.message)
+        else:
+            print(e)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
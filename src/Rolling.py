@@ -0,0 +1,87 @@
+from typing import Any, Tuple
+import numpy as np
+import pandas as pd
+from Downsampling import to_numeric
+
+# Rolling statistics over one sorted series in O(N) (mean/std, from cumulative sums) and
+# O(N log W) (min/max, from a sparse table), for count-based and time-based windows alike.
+# A window is given by the index of its first point for every point of the series.
+
+
+def window_starts(x: np.ndarray, window: Any) -> np.ndarray:
+    """[Index of the first point of the window ending at every point]
+
+    Arguments:
+        x {np.ndarray} -- [x-values (numbers or datetimes), sorted ascending]
+        window {Any} -- [int: number of points; str/pd.Timedelta: time span such as "1h" (for
+        datetime x-values); float: span in x-units. Time/x spans cover (x - window, x]]
+
+    Returns:
+        np.ndarray -- [int64 array of window starts]
+    """
+    n = len(x)
+    if isinstance(window, (int, np.integer)):
+        return np.maximum(np.arange(n) - (window - 1), 0)
+    if isinstance(window, (str, pd.Timedelta)):
+        # Milliseconds, like the x-values from 'to_numeric'
+        window = pd.Timedelta(window).total_seconds() * 1000
+    x = to_numeric(x)
+    return np.searchsorted(x, x - window, side="right")
+
+
+def rolling_mean_std(y: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """[Rolling mean and (sample) standard deviation from cumulative sums of y and y**2; NaNs
+    are skipped]
+
+    Arguments:
+        y {np.ndarray} -- [y-values]
+        starts {np.ndarray} -- [Window starts from 'window_starts']
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- [Mean and standard deviation per point]
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    # Centering keeps the sums small, which limits cancellation in the variance
+    shift = y[valid].mean() if valid.any() else 0.0
+    centered = np.where(valid, y - shift, 0.0)
+    ends = np.arange(1, len(y) + 1)
+    count, total, squares = (
+        np.r_[0, np.cumsum(values)][ends] - np.r_[0, np.cumsum(values)][starts]
+        for values in (valid.astype(np.float64), centered, centered ** 2)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        variance = (squares - total * mean) / (count - 1)
+    return mean + shift, np.sqrt(np.clip(variance, 0, None))
+
+
+def rolling_min_max(y: np.ndarray, starts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """[Rolling minimum and maximum. Level k of a sparse table holds the extremes of 2**k
+    consecutive points; every window is covered by two overlapping blocks of the largest level
+    fitting in it. Levels are built one at a time, so memory stays O(N); NaNs are skipped]
+
+    Arguments:
+        y {np.ndarray} -- [y-values]
+        starts {np.ndarray} -- [Window starts from 'window_starts']
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- [Minimum and maximum per point]
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    ends = np.arange(n)
+    lengths = ends - starts + 1
+    levels = np.floor(np.log2(np.maximum(lengths, 1))).astype(np.int64)
+    low, high = y.copy(), y.copy()
+    result_low, result_high = np.empty(n), np.empty(n)
+    for level in range(int(levels.max()) + 1 if n else 0):
+        size = 1 << level
+        query = np.flatnonzero(levels == level)
+        right = ends[query] - size + 1
+        result_low[query] = np.fmin(low[starts[query]], low[right])
+        result_high[query] = np.fmax(high[starts[query]], high[right])
+        # Next level: blocks of twice the size
+        low[: n - size] = np.fmin(low[: n - size], low[size:])
+        high[: n - size] = np.fmax(high[: n - size], high[size:])
+    return result_low, result_high
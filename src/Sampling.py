@@ -0,0 +1,229 @@
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from Downsampling import to_numeric
+
+# Stratified sampling of scatter data. Every category gets a quota of the point budget (small
+# categories are kept whole), the points of a category are drawn by giving every row a random
+# key and keeping the smallest keys (a vectorized reservoir sample), and points that carry the
+# shape of a category (convex hull vertices and z-score outliers) are always kept. Discretized
+# data can first be collapsed to its distinct points without losing anything.
+
+
+def collapse_duplicates(x, y, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """[Distinct (category, x, y) points and their multiplicity. x and y are factorized, the
+    three codes are packed into one int64 key and counted with one 'np.unique' (rows of codes
+    are compared instead when the key would overflow)]
+
+    Arguments:
+        x {array-like} -- [x-values (numbers or datetimes)]
+        y {array-like} -- [y-values]
+        codes {np.ndarray} -- [Category code of every point (-1 for points to drop)]
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- [First row of every distinct point, ordered by
+        category, x and y, and the number of rows sharing it (rows with a missing value or
+        category are left out)]
+    """
+    x_codes, x_uniques = pd.factorize(np.asarray(x), sort=True)
+    y_codes, y_uniques = pd.factorize(np.asarray(y), sort=True)
+    codes = np.asarray(codes, dtype=np.int64)
+    rows = np.flatnonzero((codes >= 0) & (x_codes >= 0) & (y_codes >= 0))
+    n_x, n_y = len(x_uniques), len(y_uniques)
+    n_categories = int(codes.max()) + 1 if len(codes) else 0
+    if n_categories * n_x * n_y < 2 ** 63:
+        keys = (codes[rows] * n_x + x_codes[rows]) * n_y + y_codes[rows]
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    else:
+        keys = np.stack([codes[rows], x_codes[rows], y_codes[rows]], axis=1)
+        _, first, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+    return rows[first], counts
+
+
+def category_quotas(counts: np.ndarray, max_points: int) -> np.ndarray:
+    """[Max-min fair split of 'max_points' over the categories: every category gets
+    min(count, T), with the largest T the budget allows, so categories smaller than their share
+    are kept whole and their unused share goes to the larger ones]
+
+    Arguments:
+        counts {np.ndarray} -- [Number of points per category]
+        max_points {int} -- [Point budget]
+
+    Returns:
+        np.ndarray -- [Quota per category]
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.sum() <= max_points:
+        return counts
+    ascending = np.sort(counts)
+    # Budget used when T is set to each count in turn: all smaller counts whole plus T for
+    # every category from there on
+    used = np.r_[0, np.cumsum(ascending)[:-1]] + ascending * np.arange(len(counts), 0, -1)
+    level = np.searchsorted(used, max_points, side="right")
+    whole = ascending[:level].sum()
+    threshold = (max_points - whole) // (len(counts) - level)
+    quotas = np.minimum(counts, threshold)
+    # Hand out the rounding remainder, one point each to the first categories below their count
+    remainder = max_points - quotas.sum()
+    short = np.flatnonzero(quotas < counts)[:remainder]
+    quotas[short] += 1
+    return quotas
+
+
+def _hull_vertices(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """[Indices of the convex hull vertices of a (small) point set, Andrew's monotone chain]"""
+    order = np.lexsort((y, x))
+    if len(order) <= 2:
+        return order
+
+    def chain(indices) -> list:
+        hull = []
+        for i in indices:
+            while len(hull) >= 2:
+                a, b = hull[-2], hull[-1]
+                cross = (x[b] - x[a]) * (y[i] - y[a]) - (y[b] - y[a]) * (x[i] - x[a])
+                if cross > 0:
+                    break
+                hull.pop()
+            hull.append(i)
+        return hull
+
+    return np.unique(chain(order) + chain(order[::-1]))
+
+
+def shape_points(
+    x: np.ndarray,
+    y: np.ndarray,
+    codes: np.ndarray,
+    n_categories: int,
+    outlier_zscore: Optional[float] = 3.0,
+    directions: int = 16,
+    chunk_size: int = 1 << 20,
+) -> np.ndarray:
+    """[Mask of the points every sample has to keep: the convex hull vertices of every category
+    and, if 'outlier_zscore' is set, the points whose x- or y-value lies more than that many
+    standard deviations from the category mean. Hull candidates are found without a loop over
+    the categories: a point strictly inside the polygon spanned by the extreme points of its
+    category in 'directions' directions cannot be a hull vertex, and only the few remaining
+    points go into an exact hull per category]
+
+    Arguments:
+        x {np.ndarray} -- [x-values (numbers or datetimes)]
+        y {np.ndarray} -- [y-values]
+        codes {np.ndarray} -- [Category code of every point (-1 for points to ignore)]
+        n_categories {int} -- [Number of categories]
+
+    Keyword Arguments:
+        outlier_zscore {Optional[float]} -- [z-score threshold, None to keep only the hulls]
+        (default: {3.0})
+        directions {int} -- [Number of directions of the candidate filter] (default: {16})
+        chunk_size {int} -- [Number of points tested at once, bounds the memory]
+        (default: {1 << 20})
+
+    Returns:
+        np.ndarray -- [Boolean mask of the points to keep]
+    """
+    x, y = to_numeric(x), np.asarray(y, dtype=np.float64)
+    valid = (codes >= 0) & np.isfinite(x) & np.isfinite(y)
+    group = np.where(valid, codes, n_categories)
+    size = n_categories + 1
+    count = np.bincount(group, minlength=size).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Standardized coordinates per category (hull vertices do not change under scaling)
+        scaled = []
+        for values in (x, y):
+            values = np.where(valid, values, 0.0)
+            mean = np.bincount(group, values, minlength=size) / count
+            centered = values - mean[group]
+            std = np.sqrt(np.bincount(group, centered ** 2, minlength=size) / count)
+            scaled.append(np.nan_to_num(centered / np.where(std > 0, std, 1.0)[group]))
+    u, v = scaled
+    keep = np.zeros(len(x), dtype=bool)
+    if outlier_zscore is not None:
+        keep = valid & ((np.abs(u) > outlier_zscore) | (np.abs(v) > outlier_zscore))
+
+    # Extreme point of every category in every direction, in angular order. One sort by
+    # category (invalid points last, left out), then per direction a segmented maximum and the
+    # (last) row reaching it
+    order = np.argsort(group, kind="stable")[: int(count[:n_categories].sum())]
+    present = np.flatnonzero(count[:n_categories])
+    starts = np.r_[0, np.cumsum(count).astype(np.int64)][present]
+    lengths = count[present].astype(np.int64)
+    positions = np.arange(len(order))
+    corners = np.zeros((size, directions, 2))
+    candidate = np.zeros(len(x), dtype=bool)
+    for k, angle in enumerate(np.linspace(0, 2 * np.pi, directions, endpoint=False)):
+        if not len(present):
+            break
+        projection = (u * np.cos(angle) + v * np.sin(angle))[order]
+        largest = np.repeat(np.maximum.reduceat(projection, starts), lengths)
+        reached = np.maximum.reduceat(np.where(projection == largest, positions, -1), starts)
+        extreme = order[reached]
+        corners[present, k, 0], corners[present, k, 1] = u[extreme], v[extreme]
+        candidate[extreme] = True
+    edges = np.roll(corners, -1, axis=1) - corners
+    for first in range(0, len(x), chunk_size):
+        part = slice(first, first + chunk_size)
+        g = group[part]
+        cross = edges[g, :, 0] * (v[part, None] - corners[g, :, 1]) - edges[g, :, 1] * (
+            u[part, None] - corners[g, :, 0]
+        )
+        # Strictly outside some edge (the corners themselves are already candidates; repeated
+        # corners give zero-length edges, which exclude nothing)
+        candidate[part] |= valid[part] & (cross < 0).any(axis=1)
+    rows = np.flatnonzero(candidate)
+    rows = rows[np.argsort(group[rows], kind="stable")]
+    starts = np.r_[0, np.cumsum(np.bincount(group[rows], minlength=size))]
+    for code in range(n_categories):
+        members = rows[starts[code] : starts[code + 1]]
+        keep[members[_hull_vertices(u[members], v[members])]] = True
+    return keep
+
+
+def stratified_sample(
+    x: np.ndarray,
+    y: np.ndarray,
+    codes: np.ndarray,
+    n_categories: int,
+    max_points: int,
+    seed: Optional[int] = 0,
+    outlier_zscore: Optional[float] = 3.0,
+) -> np.ndarray:
+    """[Stratified sample of scatter data: per-category quotas ('category_quotas'), filled with
+    the points of smallest random key per category (a reservoir sample of every category, drawn
+    with one sort), after the hull vertices and outliers ('shape_points'), which are always
+    kept, even beyond 'max_points']
+
+    Arguments:
+        x {np.ndarray} -- [x-values (numbers or datetimes)]
+        y {np.ndarray} -- [y-values]
+        codes {np.ndarray} -- [Category code of every point (-1 for points to drop)]
+        n_categories {int} -- [Number of categories]
+        max_points {int} -- [Point budget]
+
+    Keyword Arguments:
+        seed {Optional[int]} -- [Seed of the random keys, the same seed gives the same sample]
+        (default: {0})
+        outlier_zscore {Optional[float]} -- [z-score threshold of the kept outliers, None for
+        hull vertices only] (default: {3.0})
+
+    Returns:
+        np.ndarray -- [Sorted indices of the sampled points]
+    """
+    codes = np.asarray(codes)
+    valid = codes >= 0
+    counts = np.bincount(codes[valid], minlength=n_categories)
+    quotas = category_quotas(counts, max_points)
+    required = shape_points(x, y, codes, n_categories, outlier_zscore)
+    keys = np.random.default_rng(seed).random(len(codes))
+    # Required points rank first within their category
+    keys[required] = -1.0
+    group = np.where(valid, codes, n_categories)
+    ranked = np.lexsort((keys, group))
+    starts = np.r_[0, np.cumsum(np.bincount(group, minlength=n_categories + 1))]
+    rank = np.empty(len(codes), dtype=np.int64)
+    rank[ranked] = np.arange(len(codes)) - np.repeat(starts[:-1], np.diff(starts))
+    limit = np.r_[
+        np.maximum(quotas, np.bincount(codes[required], minlength=n_categories)), 0
+    ]
+    return np.flatnonzero(rank < limit[group])
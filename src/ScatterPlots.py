@@ -1,7 +1,13 @@
-from bokeh.models import ColumnDataSource, CategoricalColorMapper, HoverTool
-from bokeh.plotting import show, output_file
+from bokeh.models import ColumnDataSource, HoverTool
+from bokeh.plotting import output_file
 import pandas as pd
+import numpy as np
 from Visualization import Visualization
+from DataSources import read_frame
+from Categories import encode_categories, partition, category_colors
+from Budget import stride_indices
+from Sampling import collapse_duplicates, stratified_sample
+from Binning import series_image
 
 # output_file("Scatter Plot.html", title="Scatter Plot")
 
@@ -53,11 +59,19 @@ class ScatterPlots(Visualization):
         legend_title: str,
         xlabel_orientation: float = 1.1,
         xaxis_padding: float = 0.2,
+        sample_size: int = None,
+        sample_seed: int = 0,
+        outlier_zscore: float = 3.0,
+        collapse: bool = False,
+        count_scaling: str = "size",
+        max_marker_scale: float = 4,
     ) -> None:
-        """[Generate Scatter plot]
+        """[Generate Scatter plot. With a payload budget on the instance ('max_bytes' /
+        'max_points'), the points are narrowed, evenly decimated or drawn as an image as needed]
         
         Arguments:
-            df {pd.DataFrame} -- [Dataframe with x-value column, y-values column, category column]    category of the curve]
+            df {pd.DataFrame} -- [Dataframe with x-value column, y-values column, category column
+            (or any input accepted by 'read_frame', only these three columns are read)]
             x_column {str} -- [Name of the x-value column]
             y_column {str} -- [Name of the y-value column]
             category_clmn {str} -- [Name of the category column]
@@ -66,33 +80,90 @@ class ScatterPlots(Visualization):
         Keyword Arguments:
             xlabel_orientation {float} -- [Rotating x-labels to fit the plot] (default: {1.1})
             xaxis_padding {float} -- [Padding for x-axis] (default: {0.2})
+            sample_size {int} -- [If set and exceeded, a stratified sample of about this many
+            points is drawn (independent of the payload budget 'max_points'): every
+            category gets a quota (small categories are kept whole), and the convex hull and
+            the points beyond 'outlier_zscore' of every category are always kept, see
+            'Sampling.stratified_sample'] (default: {None})
+            sample_seed {int} -- [Seed of the sample, the same seed gives the same points]
+            (default: {0})
+            outlier_zscore {float} -- [z-score beyond which points are always kept, None for
+            the convex hulls only] (default: {3.0})
+            collapse {bool} -- [If 'True', rows sharing the same (x, y, category) are drawn as
+            one marker, scaled by their count, which the hover tool shows] (default: {False})
+            count_scaling {str} -- [With 'collapse': "size" (marker area grows with the count)
+            or "alpha" (opacity grows with the logarithm of the count)] (default: {"size"})
+            max_marker_scale {float} -- [With 'collapse' and "size": size of the most frequent
+            point relative to 'bubble_size'] (default: {4})
         
         Returns:
             [None]
             
         """
         try:
-            lst_categories = df[category_clmn].unique()
-            color_mapper = CategoricalColorMapper(
-                factors=lst_categories, palette=self.colors[: len(lst_categories)]
-            )
-            for category in df[category_clmn].unique():
-                dfnew = df.loc[(df[category_clmn] == category)]
-                source = ColumnDataSource(
-                    dict(
-                        x=dfnew[x_column],
-                        y=dfnew[y_column],
-                        category_clmn=dfnew[category_clmn],
+            df = read_frame(df, [x_column, y_column, category_clmn])
+            codes, labels = encode_categories(df[category_clmn])
+            order, bounds = partition(codes, len(labels))
+            colors = category_colors(self.colors, len(labels))
+            x_all = df[x_column].to_numpy()[order]
+            y_all = df[y_column].to_numpy()[order]
+            codes_sorted = codes[order]
+            columns = dict(x=x_all, y=y_all)
+            if collapse:
+                if count_scaling not in ("size", "alpha"):
+                    raise ValueError("count_scaling must be 'size' or 'alpha'")
+                keep, counts = collapse_duplicates(x_all, y_all, codes_sorted)
+                columns = dict(x=x_all[keep], y=y_all[keep], count=counts)
+                most = max(int(counts.max()) - 1, 1) if len(counts) else 1
+                if count_scaling == "size":
+                    # Marker area proportional to the count
+                    columns["size"] = self.bubble_size * np.sqrt(
+                        1 + (max_marker_scale ** 2 - 1) * (counts - 1) / most
+                    )
+                else:
+                    columns["alpha"] = self.transparency + (1 - self.transparency) * (
+                        np.log1p(counts - 1) / np.log1p(most)
                     )
+                # Distinct points come ordered by category
+                codes_sorted = codes_sorted[keep]
+                bounds = np.searchsorted(codes_sorted, np.arange(len(labels) + 1))
+            if sample_size is not None and bounds[-1] - bounds[0] > sample_size:
+                keep = stratified_sample(
+                    columns["x"],
+                    columns["y"],
+                    codes_sorted,
+                    len(labels),
+                    sample_size,
+                    seed=sample_seed,
+                    outlier_zscore=outlier_zscore,
                 )
+                # The sample keeps the category order, so the bounds shift down
+                columns = {key: values[keep] for key, values in columns.items()}
+                bounds = np.searchsorted(keep, bounds)
+            series = []
+            for code in range(len(labels)):
+                rows = slice(bounds[code], bounds[code + 1])
+                series.append({key: values[rows] for key, values in columns.items()})
+            series = self.fit_to_budget(
+                series,
+                decimate=lambda item, fraction: {
+                    key: values[stride_indices(len(values), fraction)]
+                    for key, values in item.items()
+                },
+                rasterize=lambda series, width, height: series_image(
+                    series, "x", "y", colors, width, height
+                ),
+            )
+            for code, label in enumerate(labels):
+                source = ColumnDataSource(series[code])
                 self.figure.scatter(
                     x="x",
                     y="y",
                     source=source,
-                    fill_alpha=self.transparency,
-                    size=self.bubble_size,
-                    fill_color={"field": "category_clmn", "transform": color_mapper},
-                    legend_group="category_clmn",
+                    fill_alpha="alpha" if "alpha" in series[code] else self.transparency,
+                    size="size" if "size" in series[code] else self.bubble_size,
+                    fill_color=colors[code],
+                    legend_label=str(label),
                 )
             self.styling_figure(
                 xlabel_orientation=xlabel_orientation, xaxis_padding=xaxis_padding
@@ -104,10 +175,15 @@ class ScatterPlots(Visualization):
                 legend_orientation="vertical",
             )
             self.figure.add_tools(
-                HoverTool(tooltips=[("X Value", "$x{0f}"), ("Y Value", "$y{0f}")])
+                HoverTool(
+                    tooltips=[("X Value", "$x{0f}"), ("Y Value", "$y{0f}")]
+                    + ([("Count", "@count")] if collapse else [])
+                )
             )
-            show(self.figure)
+            self.display_figure()
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
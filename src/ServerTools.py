@@ -0,0 +1,69 @@
+import time
+from typing import Callable
+from bokeh.document import Document
+
+# Helpers for plots served by a Bokeh server, where Python callbacks react to the browser
+
+
+def debounce(doc: Document, callback: Callable[[], None], delay_ms: int) -> Callable:
+    """[Wraps 'callback' so that a burst of events (e.g. range changes while dragging) runs it
+    only once, 'delay_ms' after the last event]
+
+    Arguments:
+        doc {Document} -- [Document the callback runs in, usually 'curdoc()']
+        callback {Callable[[], None]} -- [Function to run without arguments]
+        delay_ms {int} -- [Quiet period in milliseconds]
+
+    Returns:
+        Callable -- [Trigger function with the 'on_change' signature (attr, old, new)]
+    """
+    pending = {"callback": None}
+
+    def run() -> None:
+        pending["callback"] = None
+        callback()
+
+    def trigger(attr, old, new) -> None:
+        if pending["callback"] is not None:
+            try:
+                doc.remove_timeout_callback(pending["callback"])
+            except ValueError:
+                # Already executed
+                pass
+        pending["callback"] = doc.add_timeout_callback(run, delay_ms)
+
+    return trigger
+
+
+def throttle(doc: Document, callback: Callable, interval_ms: int) -> Callable:
+    """[Wraps 'callback' so that a stream of events (e.g. mouse moves) runs it at most once every
+    'interval_ms'. The first event runs at once, later ones within the interval are merged into
+    one call with the arguments of the latest event at the end of the interval]
+
+    Arguments:
+        doc {Document} -- [Document the callback runs in, usually 'curdoc()']
+        callback {Callable} -- [Function called with the arguments of the event]
+        interval_ms {int} -- [Smallest time between two calls in milliseconds]
+
+    Returns:
+        Callable -- [Trigger function, passes its arguments on to 'callback']
+    """
+    state = {"last": -float("inf"), "callback": None, "args": ()}
+
+    def run() -> None:
+        state["callback"] = None
+        state["last"] = time.monotonic()
+        callback(*state["args"])
+
+    def trigger(*args) -> None:
+        state["args"] = args
+        if state["callback"] is not None:
+            # Already scheduled, it will use these arguments
+            return
+        wait = interval_ms - (time.monotonic() - state["last"]) * 1000
+        if wait <= 0:
+            run()
+        else:
+            state["callback"] = doc.add_timeout_callback(run, wait)
+
+    return trigger
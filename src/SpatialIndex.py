@@ -0,0 +1,114 @@
+from typing import Optional
+import numpy as np
+from Downsampling import to_numeric
+
+# Nearest-point lookup over full-resolution data for server-side hover. Points are bucketed once
+# into a uniform grid (one sort by cell); a query scans rings of cells around the cursor until
+# no unvisited cell can hold a closer point. Distances are measured in screen pixels, so the
+# "nearest" point is the visually nearest one at every zoom level and axis aspect.
+
+
+class GridIndex:
+    def __init__(self, x, y, points_per_cell: int = 16) -> None:
+        """[Builds the grid over all points, about 'points_per_cell' points per cell on average]
+
+        Arguments:
+            x {array-like} -- [x-values (numbers or datetimes)]
+            y {array-like} -- [y-values]
+
+        Keyword Arguments:
+            points_per_cell {int} -- [Average number of points per cell] (default: {16})
+        """
+        x, y = to_numeric(x), to_numeric(y)
+        valid = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+        self.x, self.y = x, y
+        self.size = int(np.clip(np.sqrt(len(valid) / points_per_cell), 1, 2048))
+        if len(valid):
+            self.x_min, self.x_max = x[valid].min(), x[valid].max()
+            self.y_min, self.y_max = y[valid].min(), y[valid].max()
+        else:
+            self.x_min = self.x_max = self.y_min = self.y_max = 0.0
+        self.cell_width = (self.x_max - self.x_min) / self.size or 1.0
+        self.cell_height = (self.y_max - self.y_min) / self.size or 1.0
+        cells = self.__cell(x[valid], y[valid])
+        sort = np.argsort(cells, kind="stable")
+        # Points of cell c are 'points[starts[c]:starts[c + 1]]'
+        self.points = valid[sort]
+        self.starts = np.r_[
+            0, np.cumsum(np.bincount(cells, minlength=self.size * self.size))
+        ]
+
+    def __column_row(self, x, y):
+        """[Private method giving the (clipped) grid column and row of positions]"""
+        column = np.clip(((x - self.x_min) / self.cell_width).astype(np.int64), 0, self.size - 1)
+        row = np.clip(((y - self.y_min) / self.cell_height).astype(np.int64), 0, self.size - 1)
+        return column, row
+
+    def __cell(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """[Private method giving the flat cell number of positions]"""
+        column, row = self.__column_row(x, y)
+        return column * self.size + row
+
+    def nearest(
+        self,
+        x: float,
+        y: float,
+        x_scale: float = 1.0,
+        y_scale: float = 1.0,
+        max_distance: float = np.inf,
+    ) -> Optional[int]:
+        """[Index of the point nearest to (x, y)]
+
+        Arguments:
+            x {float} -- [x-position (numeric, milliseconds since epoch for datetimes)]
+            y {float} -- [y-position]
+
+        Keyword Arguments:
+            x_scale {float} -- [Pixels per x-unit] (default: {1.0})
+            y_scale {float} -- [Pixels per y-unit] (default: {1.0})
+            max_distance {float} -- [Points further away (in pixels) are ignored]
+            (default: {np.inf})
+
+        Returns:
+            Optional[int] -- [Row of the nearest point in the indexed data, None if there is no
+            point within 'max_distance']
+        """
+        if len(self.points) == 0:
+            return None
+        column, row = (int(value) for value in self.__column_row(np.float64(x), np.float64(y)))
+        # The cursor can lie anywhere in its cell, so cells outside ring r - 1 (not scanned yet
+        # when ring r starts) are at least r - 1 cells away from it
+        ring_step = min(self.cell_width * abs(x_scale), self.cell_height * abs(y_scale))
+        best, best_distance = None, max_distance ** 2
+        for ring in range(self.size):
+            if best_distance <= ((ring - 1) * ring_step) ** 2:
+                break
+            columns = np.arange(max(column - ring, 0), min(column + ring, self.size - 1) + 1)
+            rows = np.arange(max(row - ring, 0), min(row + ring, self.size - 1) + 1)
+            inner_rows = rows[np.abs(rows - row) != ring]
+            # Only the border of the square, the inside was scanned by the previous rings
+            sides = []
+            if row - ring >= 0:
+                sides.append(columns * self.size + row - ring)
+            if ring and row + ring < self.size:
+                sides.append(columns * self.size + row + ring)
+            if column - ring >= 0:
+                sides.append((column - ring) * self.size + inner_rows)
+            if ring and column + ring < self.size:
+                sides.append((column + ring) * self.size + inner_rows)
+            if not sides:
+                # The whole grid has been scanned
+                break
+            cells = np.concatenate(sides)
+            lengths = self.starts[cells + 1] - self.starts[cells]
+            if not lengths.sum():
+                continue
+            positions = np.repeat(self.starts[cells] - np.cumsum(np.r_[0, lengths[:-1]]), lengths)
+            candidates = self.points[positions + np.arange(lengths.sum())]
+            distances = ((self.x[candidates] - x) * x_scale) ** 2 + (
+                (self.y[candidates] - y) * y_scale
+            ) ** 2
+            closest = np.argmin(distances)
+            if distances[closest] <= best_distance:
+                best, best_distance = int(candidates[closest]), distances[closest]
+        return best
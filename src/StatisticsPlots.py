@@ -1,9 +1,23 @@
-from bokeh.models import ColumnDataSource, HoverTool, FactorRange
-from bokeh.plotting import show
+from bokeh.models import (
+    ColumnDataSource,
+    HoverTool,
+    FactorRange,
+    ColorBar,
+    CustomJSHover,
+    FixedTicker,
+    LinearColorMapper,
+    LogColorMapper,
+)
+from bokeh.palettes import Blues256, RdBu11
 import pandas as pd
 import numpy as np
 from Visualization import Visualization
-from typing import List
+from DataSources import read_frame
+from Categories import encode_categories, category_colors, top_k
+from Binning import histogram2d, hexbin, data_bounds
+from Correlation import correlation_matrix, cluster_order
+from Density import grouped_kde, group_quantiles
+from typing import List, Optional, Tuple
 from bokeh.plotting import figure
 
 # output_file("Statistics Plots.html", title="Statistics Plots")
@@ -82,11 +96,15 @@ class StatisticsPlots(Visualization):
         transparency: float = 0.6,
         legend_title: str = "Legends",
         xaxis_padding: float = 0.1,
+        kde_overlay: bool = False,
+        bandwidth_method: str = "scott",
+        kde_grid_size: int = 512,
     ) -> None:
         """[Generate the histogram plot]
 
         Arguments:
-            data {pd.DataFrame} -- [pandas Dataframe]
+            data {pd.DataFrame} -- [pandas Dataframe (or any input accepted by 'read_frame',
+            only 'column_names' are read)]
             column_names {List[str]} -- [columns of the passed dataframe]
 
         Keyword Arguments:
@@ -97,11 +115,17 @@ class StatisticsPlots(Visualization):
             transparency {float} -- [Alpha value of the whiskers] (default: {0.6})
             legend_title {str} -- [Legends of the plot] (default: {"Legends"})
             xaxis_padding {float} -- [Padding for x-axis] (default: {0.1})
+            kde_overlay {bool} -- [If 'True', a kernel density estimate of every column is drawn
+            over its histogram, scaled to the frequencies] (default: {False})
+            bandwidth_method {str} -- [Bandwidth rule of the KDE, "scott" or "silverman"]
+            (default: {"scott"})
+            kde_grid_size {int} -- [Number of points of the KDE curves] (default: {512})
 
         Returns:
             [None] -- [Shows the figure]
         """
         try:
+            data = read_frame(data, column_names)
             data = [data[col] for col in column_names]
             if use_bin_size:
                 min_value = min(map(min, zip(*data)))
@@ -110,6 +134,7 @@ class StatisticsPlots(Visualization):
 
             p = self.figure
             count = 0
+            bin_widths = []
             for color, dt, name in zip(self.colors, data, column_names):
                 if use_bin_size:
                     frequencies, edges = np.histogram(dt, ranges, density=False)
@@ -137,6 +162,29 @@ class StatisticsPlots(Visualization):
                         alpha=transparency,
                         legend_label=name,
                     )
+                bin_widths.append(edges[1] - edges[0])
+            if kde_overlay:
+                # All columns in one pass, column i as group i
+                values = np.concatenate([dt.to_numpy(dtype=float) for dt in data])
+                codes = np.repeat(np.arange(len(data)), [len(dt) for dt in data])
+                grid, densities = grouped_kde(
+                    values,
+                    codes,
+                    len(data),
+                    grid_size=kde_grid_size,
+                    method=bandwidth_method,
+                )
+                for color, dt, name, width, density in zip(
+                    self.colors, data, column_names, bin_widths, densities
+                ):
+                    # Density times the number of values and the bin width gives frequencies
+                    p.line(
+                        grid,
+                        density * dt.count() * width,
+                        line_color=color,
+                        line_width=2,
+                        legend_label=name,
+                    )
             p.y_range.start = 0
             self.legend_settings(legend_title=legend_title, legend_clickable=True)
             self.styling_figure(xaxis_padding=xaxis_padding)
@@ -149,9 +197,11 @@ class StatisticsPlots(Visualization):
             )
             p.add_tools(hover_tool)
             p.legend.title = legend_title
-            show(p)
+            self.display_figure()
             return None
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
@@ -184,7 +234,11 @@ class StatisticsPlots(Visualization):
         try:
             p = self.figure
             source = ColumnDataSource(
-                dict(x=category, values=frequency, color=self.colors[: len(category)])
+                dict(
+                    x=category,
+                    values=frequency,
+                    color=category_colors(self.colors, len(category)),
+                )
             )
             # hover info
             hover_tool = HoverTool(tooltips=[("Frequency", "@values")])
@@ -204,9 +258,11 @@ class StatisticsPlots(Visualization):
             self.legend_settings(has_legend=False)
             p.x_range.factors = category
             p.y_range.start = 0
-            show(p)
+            self.display_figure()
             return None
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
@@ -255,7 +311,7 @@ class StatisticsPlots(Visualization):
             hover_tool = HoverTool(
                 tooltips=[(legend_title, "$name"), ("Frequency", "@$name")]
             )
-            colors = self.colors[: len(category2)]
+            colors = category_colors(self.colors, len(category2))
 
             p.vbar_stack(
                 category2,
@@ -280,13 +336,150 @@ class StatisticsPlots(Visualization):
             p.y_range.start = 0
             p.x_range.factors = data[category1]
             p.add_tools(hover_tool)
-            show(p)
+            self.display_figure()
             return None
         except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_top_k_bar_chart(
+        self,
+        df: pd.DataFrame,
+        category_column: str,
+        k: int = 20,
+        value_column: str = None,
+        other_label: str = "Other",
+        **kwargs,
+    ) -> None:
+        """[Generate Bar graph of the 'k' most frequent categories of raw long-format rows,
+        all remaining categories are folded into one "Other" bar. Frequencies are counted with
+        'np.bincount' over the category codes]
+
+        Arguments:
+            df {pd.DataFrame} -- [Dataframe with one row per observation (or any input accepted
+            by 'read_frame')]
+            category_column {str} -- [Name of the category column]
+
+        Keyword Arguments:
+            k {int} -- [Number of categories to keep] (default: {20})
+            value_column {str} -- [If set, the bars show the sum of this column instead of the
+            number of rows] (default: {None})
+            other_label {str} -- [Label of the bar with the remaining categories]
+            (default: {"Other"})
+            **kwargs -- [Passed to 'generate_bar_chart']
+
+        Returns:
+            [None] -- [Shows the figure]
+        """
+        try:
+            df = read_frame(df, [category_column] + ([value_column] if value_column else []))
+            codes, labels = encode_categories(df[category_column])
+            valid = codes >= 0
+            weights = None if value_column is None else df[value_column].to_numpy()[valid]
+            totals = np.bincount(codes[valid], weights=weights, minlength=len(labels))
+            top = top_k(totals, k)
+            category = [str(label) for label in labels[top]]
+            frequency = totals[top].tolist()
+            if len(top) < len(labels):
+                category.append(other_label)
+                frequency.append(totals.sum() - totals[top].sum())
+        except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
                 print(e)
+            return None
+        return self.generate_bar_chart(category=category, frequency=frequency, **kwargs)
+
+    def generate_top_k_stacked_bar_chart(
+        self,
+        df: pd.DataFrame,
+        x_column: str,
+        stack_column: str,
+        legend_title: str,
+        k: int = 10,
+        value_column: str = None,
+        other_label: str = "Other",
+        x_k: Optional[int] = 50,
+        **kwargs,
+    ) -> None:
+        """[Generate Stacked Bar chart from raw long-format rows. Only the 'k' stack categories
+        with the largest totals get their own segment and only the 'x_k' largest bars are drawn,
+        the others are folded into "Other" (a segment and a bar). The (bar x stack) frequency
+        table is one 'np.bincount' over the combined codes]
+
+        Arguments:
+            df {pd.DataFrame} -- [Dataframe with one row per observation (or any input accepted
+            by 'read_frame')]
+            x_column {str} -- [Name of the column giving the bars]
+            stack_column {str} -- [Name of the column giving the stacked segments]
+            legend_title {str} -- [Title of the legends of the plot]
+
+        Keyword Arguments:
+            k {int} -- [Number of stack categories to keep] (default: {10})
+            value_column {str} -- [If set, the segments show the sum of this column instead of
+            the number of rows] (default: {None})
+            other_label {str} -- [Label of the segment and the bar with the remaining
+            categories] (default: {"Other"})
+            x_k {Optional[int]} -- [Number of bars to keep, largest total first; None keeps all
+            bars in their order] (default: {50})
+            **kwargs -- [Passed to 'generate_stacked_bar_chart']
+
+        Returns:
+            [None] -- [Shows the figure]
+        """
+        try:
+            df = read_frame(
+                df, [x_column, stack_column] + ([value_column] if value_column else [])
+            )
+            x_codes, x_labels = encode_categories(df[x_column])
+            stack_codes, stack_labels = encode_categories(df[stack_column])
+            valid = (x_codes >= 0) & (stack_codes >= 0)
+            x_codes, stack_codes = x_codes[valid], stack_codes[valid]
+            weights = None if value_column is None else df[value_column].to_numpy()[valid]
+            totals = np.bincount(stack_codes, weights=weights, minlength=len(stack_labels))
+            top = top_k(totals, k)
+            # Segment of every stack code: its rank when kept, the last ("Other") otherwise
+            segment = np.full(len(stack_labels), len(top))
+            segment[top] = np.arange(len(top))
+            n_segments = len(top) + 1
+            # Same for the bars
+            if x_k is None:
+                x_top = np.arange(len(x_labels))
+            else:
+                x_totals = np.bincount(x_codes, weights=weights, minlength=len(x_labels))
+                x_top = top_k(x_totals, x_k)
+            bar = np.full(len(x_labels), len(x_top))
+            bar[x_top] = np.arange(len(x_top))
+            n_bars = len(x_top) + (len(x_top) < len(x_labels))
+            table = np.bincount(
+                bar[x_codes] * n_segments + segment[stack_codes],
+                weights=weights,
+                minlength=n_bars * n_segments,
+            ).reshape(n_bars, n_segments)
+            bars = [str(label) for label in x_labels[x_top]]
+            if len(x_top) < len(x_labels):
+                bars.append(other_label)
+            data = {x_column: bars}
+            for column, label in enumerate(stack_labels[top]):
+                data[str(label)] = table[:, column]
+            if len(top) < len(stack_labels):
+                data[other_label] = table[:, -1]
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+            return None
+        return self.generate_stacked_bar_chart(data=data, legend_title=legend_title, **kwargs)
 
     def generate_box_plot(
         self,
@@ -301,7 +494,8 @@ class StatisticsPlots(Visualization):
         """[summary]
 
         Arguments:
-            df {pd.DataFrame} -- [Datafram consists of Value and category clms]
+            df {pd.DataFrame} -- [Datafram consists of Value and category clms (or any input
+            accepted by 'read_frame')]
             value_column {str} -- [Name of the value column]
             category_column {str} -- [Name of the category column]
 
@@ -315,10 +509,11 @@ class StatisticsPlots(Visualization):
             [None] -- [Shows the plot]
         """
         try:
+            df = read_frame(df, [value_column, category_column])
             p = self.figure
             dt = pd.DataFrame(dict(freq=df[value_column], group=df[category_column]))
             groups = dt.groupby("group")
-            lst_categories = df[category_column].unique()
+            lst_categories = df[category_column].unique().tolist()
             # Calculating Quartiles
             q1 = groups.quantile(q=0.25)
             q2 = groups.quantile(q=0.5)
@@ -404,9 +599,380 @@ class StatisticsPlots(Visualization):
             )
             p.x_range.factors = lst_categories
             p.add_tools(hover_tool)
-            show(p)
+            self.display_figure()
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_violin_plot(
+        self,
+        df: pd.DataFrame,
+        value_column: str,
+        category_column: str,
+        bandwidth_method: str = "scott",
+        grid_size: int = 256,
+        violin_width: float = 0.8,
+        transparency: float = 0.6,
+        xlabel_orientation: float = 0.4,
+    ) -> None:
+        """[Generate a violin plot: the kernel density estimate of every category mirrored around
+        its position, with the interquartile range and the median marked inside. All densities
+        are computed in one pass (linear binning and FFT convolution), so millions of values are
+        fine. As for the box plot, the figure has to be created with a 'FactorRange' x-range]
+
+        Arguments:
+            df {pd.DataFrame} -- [Datafram consists of Value and category clms (or any input
+            accepted by 'read_frame')]
+            value_column {str} -- [Name of the value column]
+            category_column {str} -- [Name of the category column]
+
+        Keyword Arguments:
+            bandwidth_method {str} -- [Bandwidth rule, "scott" or "silverman"]
+            (default: {"scott"})
+            grid_size {int} -- [Number of points of every density curve] (default: {256})
+            violin_width {float} -- [Width of the widest violin] (default: {0.8})
+            transparency {float} -- [Alpha value of the violins] (default: {0.6})
+            xlabel_orientation {float} -- [Rotation of x-axis labels] (default: {0.4})
+
+        Returns:
+            [None] -- [Shows the plot]
+        """
+        try:
+            df = read_frame(df, [value_column, category_column])
+            p = self.figure
+            codes, labels = encode_categories(df[category_column])
+            labels = [str(label) for label in labels]
+            values = df[value_column].to_numpy(dtype=float)
+            grid, densities = grouped_kde(
+                values, codes, len(labels), grid_size=grid_size, method=bandwidth_method
+            )
+            valid = (codes >= 0) & ~np.isnan(values)
+            q1, median, q3 = group_quantiles(
+                values[valid], codes[valid], len(labels), [0.25, 0.5, 0.75]
+            )
+            counts = np.bincount(codes[valid], minlength=len(labels))
+            # Half-widths as categorical offsets, the widest violin gets 'violin_width'
+            half_widths = densities * (violin_width / 2 / max(densities.max(), 1e-300))
+            xs, ys = [], []
+            for label, half_width in zip(labels, half_widths):
+                # Trim the tails that would be drawn narrower than a hairline
+                shown = np.flatnonzero(half_width > 1e-3 * violin_width)
+                part = slice(shown[0], shown[-1] + 1) if len(shown) else slice(0, 0)
+                offsets = np.r_[half_width[part], -half_width[part][::-1]]
+                xs.append([(label, offset) for offset in offsets])
+                ys.append(np.r_[grid[part], grid[part][::-1]])
+            source = ColumnDataSource(
+                dict(
+                    xs=xs,
+                    ys=ys,
+                    category=labels,
+                    count=counts,
+                    q1=q1,
+                    median=median,
+                    q3=q3,
+                    color=category_colors(self.colors, len(labels)),
+                )
+            )
+            violins = p.patches(
+                xs="xs",
+                ys="ys",
+                source=source,
+                fill_color="color",
+                fill_alpha=transparency,
+                line_color="black",
+            )
+            p.vbar(
+                x=labels,
+                width=0.05 * violin_width,
+                bottom=q1,
+                top=q3,
+                fill_color="black",
+                line_color="black",
+            )
+            p.circle(x=labels, y=median, size=6, fill_color="white", line_color="black")
+            self.styling_figure(
+                xlabel_orientation=xlabel_orientation, yaxis_notation=False
+            )
+            hover_tool = HoverTool(
+                renderers=[violins],
+                tooltips=[
+                    ("Category", "@category"),
+                    ("Count", "@count"),
+                    ("Quartile 1", "@q1{1f}"),
+                    ("Median", "@median{1f}"),
+                    ("Quartile 3", "@q3{1f}"),
+                ],
+            )
+            p.x_range.factors = labels
+            p.add_tools(hover_tool)
+            self.display_figure()
         except Exception as e:
+            if self.raise_errors:
+                raise
             if hasattr(e, "message"):
                 print(e.message)
             else:
                 print(e)
+
+    def generate_2d_histogram_plot(
+        self,
+        data: pd.DataFrame,
+        x_column: str,
+        y_column: str,
+        number_of_bins: int = 100,
+        x_range: Tuple[float, float] = None,
+        y_range: Tuple[float, float] = None,
+        log_scale: bool = False,
+        xaxis_padding: float = 0,
+    ) -> None:
+        """[Generate a 2D histogram (density) plot, drawn as one 'image' glyph. The figure size is
+        bounded by the number of bins, not by the number of observations]
+
+        Arguments:
+            data {pd.DataFrame} -- [Dataframe with x-value and y-value columns (or any input
+            accepted by 'read_frame'), or a list/iterator of such chunks, e.g.
+            pd.read_csv(path, chunksize=1_000_000)]
+            x_column {str} -- [Name of the x-value column]
+            y_column {str} -- [Name of the y-value column]
+
+        Keyword Arguments:
+            number_of_bins {int} -- [Number of bins per axis] (default: {100})
+            x_range {Tuple[float, float]} -- [Binned x-range, data extent when None; required
+            for iterator input] (default: {None})
+            y_range {Tuple[float, float]} -- [Binned y-range, data extent when None; required
+            for iterator input] (default: {None})
+            log_scale {bool} -- [Logarithmic colour scale] (default: {False})
+            xaxis_padding {float} -- [Padding for x-axis] (default: {0})
+
+        Returns:
+            [None] -- [Shows the figure]
+        """
+        try:
+            p = self.figure
+            counts, x_edges, y_edges = histogram2d(
+                data,
+                x_column,
+                y_column,
+                bins=number_of_bins,
+                x_range=x_range,
+                y_range=y_range,
+            )
+            # Empty bins stay transparent
+            counts[counts == 0] = np.nan
+            mapper = self.__density_color_mapper(counts, log_scale)
+            p.image(
+                image=[counts.T],
+                x=x_edges[0],
+                y=y_edges[0],
+                dw=x_edges[-1] - x_edges[0],
+                dh=y_edges[-1] - y_edges[0],
+                color_mapper=mapper,
+            )
+            p.add_layout(ColorBar(color_mapper=mapper), "right")
+            self.styling_figure(xaxis_padding=xaxis_padding, yaxis_notation=False)
+            hover_tool = HoverTool(
+                tooltips=[
+                    ("Frequency", "@image{0f}"),
+                    ("X Value", "$x{1f}"),
+                    ("Y Value", "$y{1f}"),
+                ]
+            )
+            p.add_tools(hover_tool)
+            self.display_figure()
+            return None
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_hexbin_plot(
+        self,
+        data: pd.DataFrame,
+        x_column: str,
+        y_column: str,
+        number_of_hexagons: int = 50,
+        x_range: Tuple[float, float] = None,
+        y_range: Tuple[float, float] = None,
+        log_scale: bool = False,
+        xaxis_padding: float = 0,
+    ) -> None:
+        """[Generate a hexagonal binning (density) plot. Hexagons are regular on screen for the
+        figure's width and height, and only non-empty hexagons are sent to the browser]
+
+        Arguments:
+            data {pd.DataFrame} -- [Dataframe with x-value and y-value columns (or any input
+            accepted by 'read_frame'), or a list/iterator of such chunks, e.g.
+            pd.read_csv(path, chunksize=1_000_000)]
+            x_column {str} -- [Name of the x-value column]
+            y_column {str} -- [Name of the y-value column]
+
+        Keyword Arguments:
+            number_of_hexagons {int} -- [Number of hexagons across the x-range] (default: {50})
+            x_range {Tuple[float, float]} -- [Binned x-range, data extent when None; required
+            for iterator input] (default: {None})
+            y_range {Tuple[float, float]} -- [Binned y-range, data extent when None; required
+            for iterator input] (default: {None})
+            log_scale {bool} -- [Logarithmic colour scale] (default: {False})
+            xaxis_padding {float} -- [Padding for x-axis] (default: {0})
+
+        Returns:
+            [None] -- [Shows the figure]
+        """
+        try:
+            p = self.figure
+            if x_range is None or y_range is None:
+                bounds = data_bounds(data, x_column, y_column)
+                x_range, y_range = x_range or bounds[0], y_range or bounds[1]
+            x_span = (x_range[1] - x_range[0]) or 1.0
+            y_span = (y_range[1] - y_range[0]) or 1.0
+            # Horizontal scaling making the hexagons regular on screen
+            aspect_scale = (p.plot_width * y_span) / (p.plot_height * x_span)
+            size = x_span * aspect_scale / (number_of_hexagons * np.sqrt(3))
+            q, r, counts = hexbin(
+                data,
+                x_column,
+                y_column,
+                size=size,
+                aspect_scale=aspect_scale,
+                x_range=x_range,
+                y_range=y_range,
+            )
+            source = ColumnDataSource(dict(q=q, r=r, counts=counts))
+            mapper = self.__density_color_mapper(counts, log_scale)
+            p.hex_tile(
+                q="q",
+                r="r",
+                size=size,
+                aspect_scale=aspect_scale,
+                source=source,
+                fill_color={"field": "counts", "transform": mapper},
+                line_color=None,
+            )
+            p.add_layout(ColorBar(color_mapper=mapper), "right")
+            self.styling_figure(xaxis_padding=xaxis_padding, yaxis_notation=False)
+            hover_tool = HoverTool(
+                tooltips=[
+                    ("Frequency", "@counts"),
+                    ("X Value", "$x{1f}"),
+                    ("Y Value", "$y{1f}"),
+                ]
+            )
+            p.add_tools(hover_tool)
+            self.display_figure()
+            return None
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def generate_correlation_heatmap(
+        self,
+        df: pd.DataFrame,
+        columns: List[str] = None,
+        method: str = "pearson",
+        cluster: bool = False,
+        block_size: int = 512,
+        max_labels: int = 60,
+        xlabel_orientation: float = 1.2,
+    ) -> None:
+        """[Generate a correlation heatmap of numeric columns, drawn as a single 'image' glyph.
+        The matrix is computed blockwise in float32 with pairwise handling of missing values, and
+        the hover tool reads the coefficients and column names from the underlying arrays.
+        The figure has to be created with a numeric x-range (the default 'x_range=None')]
+
+        Arguments:
+            df {pd.DataFrame} -- [Dataframe (or any input accepted by 'read_frame')]
+
+        Keyword Arguments:
+            columns {List[str]} -- [Columns to correlate, all numeric columns when None]
+            (default: {None})
+            method {str} -- ["pearson" or "spearman"] (default: {"pearson"})
+            cluster {bool} -- [Reorder the columns by hierarchical clustering (needs scipy)]
+            (default: {False})
+            block_size {int} -- [Number of columns per block, bounds the memory]
+            (default: {512})
+            max_labels {int} -- [Column names are shown as axis labels up to this many columns,
+            above that only in the hover tool] (default: {60})
+            xlabel_orientation {float} -- [Rotation of x-axis labels] (default: {1.2})
+
+        Returns:
+            [None] -- [Shows the figure]
+        """
+        try:
+            df = read_frame(df, columns)
+            df = df.select_dtypes(include="number") if columns is None else df
+            names = [str(col) for col in df.columns]
+            correlation = correlation_matrix(df, method=method, block_size=block_size)
+            if cluster:
+                order = cluster_order(correlation)
+                correlation = correlation[np.ix_(order, order)]
+                names = [names[i] for i in order]
+            n = len(names)
+            p = self.figure
+            mapper = LinearColorMapper(palette=RdBu11[::-1], low=-1, high=1)
+            # Column i covers x (and y) from i to i + 1
+            p.image(image=[correlation], x=0, y=0, dw=n, dh=n, color_mapper=mapper)
+            p.add_layout(ColorBar(color_mapper=mapper), "right")
+            self.styling_figure(xlabel_orientation=xlabel_orientation, yaxis_notation=False)
+            p.x_range.start, p.x_range.end = 0, n
+            p.y_range.start, p.y_range.end = 0, n
+            p.grid.visible = False
+            if n <= max_labels:
+                ticks = [i + 0.5 for i in range(n)]
+                labels = {tick: name for tick, name in zip(ticks, names)}
+                for axis in (p.xaxis, p.yaxis):
+                    axis.ticker = FixedTicker(ticks=ticks)
+                    axis.major_label_overrides = labels
+            column_name = CustomJSHover(
+                args=dict(names=ColumnDataSource(dict(name=names))),
+                code="return names.data.name[Math.floor(value)] || ''",
+            )
+            hover_tool = HoverTool(
+                tooltips=[
+                    ("Column X", "$x{custom}"),
+                    ("Column Y", "$y{custom}"),
+                    ("Correlation", "@image{0.000}"),
+                ],
+                formatters={"$x": column_name, "$y": column_name},
+            )
+            p.add_tools(hover_tool)
+            self.display_figure()
+            return None
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def __density_color_mapper(self, counts: np.ndarray, log_scale: bool):
+        """[Private method creating the colour mapper of the density plots, light for low and
+        dark for high counts]
+
+        Arguments:
+            counts {np.ndarray} -- [Counts of the bins]
+            log_scale {bool} -- [Logarithmic colour scale]
+
+        Returns:
+            [LinearColorMapper/LogColorMapper] -- [Colour mapper]
+        """
+        high = max(float(np.nanmax(counts)) if np.size(counts) else 1.0, 1.0)
+        # Empty bins are NaN and stay transparent (the mappers default to gray)
+        if log_scale:
+            return LogColorMapper(
+                palette=Blues256[::-1], low=1, high=high, nan_color="rgba(0, 0, 0, 0)"
+            )
+        return LinearColorMapper(
+            palette=Blues256[::-1], low=0, high=high, nan_color="rgba(0, 0, 0, 0)"
+        )
@@ -1,5 +1,27 @@
+from bokeh.events import MouseLeave, MouseMove
+from bokeh.io import curdoc
+from bokeh.document import Document
+from bokeh.layouts import gridplot
+from bokeh.models import (
+    CDSView,
+    ColumnDataSource,
+    CustomJSFilter,
+    DataRange1d,
+    HoverTool,
+    IndexFilter,
+    LabelSet,
+)
 from bokeh.palettes import Blues8
-from bokeh.plotting import figure
+from bokeh.plotting import figure, show
+import numpy as np
+import pandas as pd
+from typing import Callable, List, Optional, Tuple
+from Budget import fit_series, payload, serialized_bytes, stride_indices
+from Categories import encode_categories, partition, category_colors
+from DataSources import read_frame
+from Downsampling import m4_indices, to_numeric
+from ServerTools import throttle
+from SpatialIndex import GridIndex
 
 # Creation of Parent class
 
@@ -18,6 +40,20 @@ class Visualization:
         "#E72D34",
     ]
     colors += Blues8[:5]
+    # When False, 'generate_*' methods only build the figure and leave it to the caller
+    # (e.g. for serialization with 'json_item'/'file_html') instead of calling 'show()'
+    auto_show = True
+    # When True, errors in 'generate_*' methods are raised instead of printed (for callers that
+    # build figures unattended, e.g. 'AsyncPlots' and 'ReportRunner')
+    raise_errors = False
+    # Payload budget of the figure (estimated bytes and/or number of points, None for no limit).
+    # Plots exceeding it fall back to narrower dtypes, decimation or an image, see 'Budget'.
+    # Not budgeted: plots whose size is bounded by their bins or grid, not by the rows
+    # (histograms, 2D histogram, hexbin, heatmap, bar charts, violin), the server-side LOD and
+    # pyramid plots (every update is bounded by the pixel width), the box plot and the picture
+    # plots
+    max_bytes = None
+    max_points = None
 
     def __init__(
         self,
@@ -120,6 +156,343 @@ class Visualization:
             self.figure.legend.orientation = legend_orientation
             self.figure.legend.location = legend_location
 
+    def display_figure(self) -> None:
+        """[Shows the figure, unless 'auto_show' is switched off for the instance]"""
+        if self.auto_show:
+            show(self.figure)
+
+    def image_size(self, max_bytes: Optional[int] = None) -> Tuple[int, int]:
+        """[Width and height of an RGBA image covering the plot: the plot size, with coarser
+        pixels when the image (base64 RGBA) would not fit 'max_bytes']
+
+        Keyword Arguments:
+            max_bytes {int} -- [Largest estimated size of the image, None for no limit]
+            (default: {None})
+
+        Returns:
+            Tuple[int, int] -- [Width and height in pixels]
+        """
+        width, height = self.figure.plot_width, self.figure.plot_height
+        if max_bytes is not None:
+            scale = min(1.0, np.sqrt(max(max_bytes, 0) / (width * height * 4 * 4 / 3)))
+            width, height = max(int(width * scale), 1), max(int(height * scale), 1)
+        return width, height
+
+    def fit_to_budget(
+        self,
+        series: List[dict],
+        decimate: Callable[[dict, float], dict],
+        rasterize: Optional[Callable[[List[dict], int, int], Tuple]],
+        reserved_bytes: int = 0,
+    ) -> List[dict]:
+        """[Applies the payload budget ('max_bytes'/'max_points') to the series of a plot before
+        its sources are built. If even decimation does not fit, the series are drawn as one RGBA
+        image and empty series are returned, so that glyphs (and legend entries) can still be
+        added as usual. The strategy and the sizes are recorded in 'figure.tags']
+
+        Arguments:
+            series {List[dict]} -- [Series of the plot, one dict of arrays per glyph]
+            decimate {Callable[[dict, float], dict]} -- [Reduces one series to about the given
+            fraction of its points]
+            rasterize {Callable[[List[dict], int, int], Tuple]} -- [Aggregates the series into
+            an image of the given width and height (the plot size, reduced to fit 'max_bytes'),
+            returns the image and its x, y, dw and dh for 'image_rgba'. None for plots without
+            an image fallback: the series are then decimated as far as the budget needs]
+
+        Keyword Arguments:
+            reserved_bytes {int} -- [Bytes the figure already spends outside the series (e.g.
+            on an image), taken off 'max_bytes'] (default: {0})
+
+        Returns:
+            List[dict] -- [Series to draw]
+        """
+        if self.max_bytes is None and self.max_points is None:
+            return series
+        max_bytes = None if self.max_bytes is None else max(self.max_bytes - reserved_bytes, 0)
+        strategy, series, (points, n_bytes) = fit_series(
+            series,
+            max_bytes,
+            self.max_points,
+            decimate,
+            min_fraction=0.05 if rasterize is not None else 0.0,
+        )
+        if strategy == "image":
+            width, height = self.image_size(max_bytes)
+            image, x, y, dw, dh = rasterize(series, width, height)
+            self.figure.image_rgba(image=[image], x=x, y=y, dw=dw, dh=dh)
+            series = [{key: values[:0] for key, values in item.items()} for item in series]
+            achieved = (image.size, serialized_bytes(image))
+        else:
+            achieved = payload(series)
+        self.figure.tags.append(
+            dict(
+                budget_strategy=strategy,
+                estimated_points=points,
+                estimated_bytes=n_bytes,
+                achieved_points=achieved[0],
+                achieved_bytes=achieved[1],
+                reserved_bytes=reserved_bytes,
+                max_points=self.max_points,
+                max_bytes=self.max_bytes,
+            )
+        )
+        return series
+
+    def generate_facet_plot(
+        self,
+        df,
+        facet_clmn: str,
+        x_column: str,
+        y_column: str,
+        glyph: str = "scatter",
+        ncols: int = 3,
+        link_x: bool = True,
+        link_y: bool = True,
+        marker_size: int = 4,
+        transparency: float = 0.6,
+        xlabel_orientation: float = 0.8,
+    ) -> None:
+        """[Generate small multiples: one panel per category of 'facet_clmn', laid out in a grid.
+        The rows are partitioned once and held once in the document, however many panels there
+        are: scatter panels share one source and select their (contiguous) rows through a view,
+        line panels share one 'multi_line' source holding one line per category. With a payload
+        budget on the instance ('max_bytes'/'max_points'), the panels are narrowed or decimated
+        (evenly for scatter, M4 for lines) as needed. Afterwards 'figure' holds the grid, so it
+        can be shown or serialized like any other plot]
+
+        Arguments:
+            df {pd.DataFrame} -- [Dataframe (or any input accepted by 'read_frame', only the
+            three columns are read)]
+            facet_clmn {str} -- [Name of the category column, one panel per category]
+            x_column {str} -- [Name of the x-value column (number or Datetime column)]
+            y_column {str} -- [Name of the y-value column]
+
+        Keyword Arguments:
+            glyph {str} -- ["scatter" or "line" (sorted by x within every panel)]
+            (default: {"scatter"})
+            ncols {int} -- [Number of panels per row] (default: {3})
+            link_x {bool} -- [Share the x-range between all panels] (default: {True})
+            link_y {bool} -- [Share the y-range between all panels] (default: {True})
+            marker_size {int} -- [Size of the scatter markers] (default: {4})
+            transparency {float} -- [Alpha value of the glyphs] (default: {0.6})
+            xlabel_orientation {float} -- [Rotation of x-axis labels] (default: {0.8})
+
+        Returns:
+            [None] -- [Shows the figure]
+        """
+        try:
+            if glyph not in ("scatter", "line"):
+                raise ValueError("glyph must be 'scatter' or 'line'")
+            df = read_frame(df, [facet_clmn, x_column, y_column])
+            codes, labels = encode_categories(df[facet_clmn])
+            order, bounds = partition(codes, len(labels))
+            colors = category_colors(self.colors, len(labels))
+            x_all = df[x_column].to_numpy()[order]
+            y_all = df[y_column].to_numpy()[order]
+            series = []
+            for code in range(len(labels)):
+                rows = slice(bounds[code], bounds[code + 1])
+                sort = slice(None)
+                if glyph == "line":
+                    sort = np.argsort(x_all[rows], kind="stable")
+                series.append(dict(x=x_all[rows][sort], y=y_all[rows][sort]))
+
+            def decimate(item: dict, fraction: float) -> dict:
+                if glyph == "line":
+                    width = max(int(len(item["x"]) * fraction / 4), 1)
+                    keep = m4_indices(to_numeric(item["x"]), item["y"], width)
+                else:
+                    keep = stride_indices(len(item["x"]), fraction)
+                return {key: values[keep] for key, values in item.items()}
+
+            # No image fallback for a grid of panels, decimated as far as needed instead
+            series = self.fit_to_budget(series, decimate=decimate, rasterize=None)
+            if glyph == "line":
+                source = ColumnDataSource(
+                    dict(
+                        xs=[item["x"] for item in series],
+                        ys=[item["y"] for item in series],
+                        facet=[str(label) for label in labels],
+                    )
+                )
+            else:
+                source = ColumnDataSource(
+                    dict(
+                        x=np.concatenate([item["x"] for item in series]),
+                        y=np.concatenate([item["y"] for item in series]),
+                    )
+                )
+                bounds = np.r_[0, np.cumsum([len(item["x"]) for item in series])]
+            x_axis_type = "datetime" if np.issubdtype(x_all.dtype, np.datetime64) else "linear"
+            x_label = self.figure.xaxis[0].axis_label
+            tags = list(self.figure.tags)
+            y_label = self.figure.yaxis[0].axis_label
+            width = self.figure.plot_width // ncols
+            height = max(self.figure.plot_height // 2, 150)
+            shared_x, shared_y = DataRange1d(), DataRange1d()
+            panels = []
+            for code, label in enumerate(labels):
+                panel = figure(
+                    title=str(label),
+                    plot_width=width,
+                    plot_height=height,
+                    x_range=shared_x if link_x else DataRange1d(),
+                    y_range=shared_y if link_y else DataRange1d(),
+                    x_axis_type=x_axis_type,
+                    # Axis labels only on the bottom row and the left column
+                    x_axis_label=x_label if code + ncols >= len(labels) else None,
+                    y_axis_label=y_label if code % ncols == 0 else None,
+                )
+                if glyph == "line":
+                    view = CDSView(source=source, filters=[IndexFilter(indices=[code])])
+                    panel.multi_line(
+                        xs="xs",
+                        ys="ys",
+                        source=source,
+                        view=view,
+                        line_color=colors[code],
+                        line_alpha=transparency,
+                    )
+                else:
+                    # The rows of the category are contiguous, so a view only needs the bounds
+                    view = CDSView(
+                        source=source,
+                        filters=[
+                            CustomJSFilter(
+                                args=dict(start=int(bounds[code]), end=int(bounds[code + 1])),
+                                code="return Array.from({length: end - start}, "
+                                "(_, i) => start + i)",
+                            )
+                        ],
+                    )
+                    panel.scatter(
+                        x="x",
+                        y="y",
+                        source=source,
+                        view=view,
+                        size=marker_size,
+                        fill_color=colors[code],
+                        line_color=None,
+                        fill_alpha=transparency,
+                    )
+                panel.add_tools(HoverTool(tooltips=[("X Value", "$x"), ("Y Value", "$y")]))
+                panels.append(panel)
+            for panel in panels:
+                # 'styling_figure' works on 'figure', applied to every panel in turn
+                self.figure = panel
+                self.styling_figure(
+                    labels_font_size="9pt",
+                    title_font_size="11pt",
+                    xlabel_orientation=xlabel_orientation,
+                )
+            self.figure = gridplot(panels, ncols=ncols, toolbar_location="right")
+            # The budget tags of the original figure move to the grid
+            self.figure.tags = tags
+            self.display_figure()
+            return None
+        except Exception as e:
+            if self.raise_errors:
+                raise
+            if hasattr(e, "message"):
+                print(e.message)
+            else:
+                print(e)
+
+    def enable_server_hover(
+        self,
+        x_values,
+        y_values,
+        categories=None,
+        labels=None,
+        doc: Document = None,
+        throttle_ms: int = 50,
+        max_distance: float = 20,
+        remove_hover_tools: bool = True,
+    ) -> GridIndex:
+        """[Server-side hover: the full-resolution points are indexed once, and on mouse moves
+        (throttled) the nearest point is looked up on the server and its exact values are shown
+        next to it. Works on downsampled or aggregated plots, where the browser only holds part
+        of the data, and spares the browser hit-testing millions of glyphs. Must run inside a
+        Bokeh server application, e.g.: bokeh serve app.py]
+
+        Arguments:
+            x_values {array-like} -- [x-values of all points (numbers or datetimes)]
+            y_values {array-like} -- [y-values of all points]
+
+        Keyword Arguments:
+            categories {array-like} -- [Category of every point, or its integer code when
+            'labels' is given] (default: {None})
+            labels {array-like} -- [Category labels indexed by the codes in 'categories']
+            (default: {None})
+            doc {Document} -- [Document of the plot] (default: {curdoc()})
+            throttle_ms {int} -- [Smallest time between two look-ups] (default: {50})
+            max_distance {float} -- [Points further from the cursor (in pixels) are not shown]
+            (default: {20})
+            remove_hover_tools {bool} -- [Remove the client-side hover tools of the figure]
+            (default: {True})
+
+        Returns:
+            GridIndex -- [Spatial index of the points]
+        """
+        doc = doc or curdoc()
+        p = self.figure
+        x_values, y_values = np.asarray(x_values), np.asarray(y_values)
+        index = GridIndex(x_values, y_values)
+        overlay = ColumnDataSource(dict(x=[], y=[], text=[]))
+        p.circle(
+            x="x", y="y", source=overlay, size=10, fill_alpha=0, line_color="black", line_width=2
+        )
+        p.add_layout(
+            LabelSet(
+                x="x",
+                y="y",
+                text="text",
+                source=overlay,
+                x_offset=8,
+                y_offset=8,
+                text_font_size="10pt",
+                background_fill_color="white",
+                background_fill_alpha=0.8,
+            )
+        )
+        if remove_hover_tools:
+            p.tools = [tool for tool in p.tools if not isinstance(tool, HoverTool)]
+
+        def describe(row: int) -> str:
+            x, y = x_values[row], y_values[row]
+            if np.issubdtype(x_values.dtype, np.datetime64):
+                x_text = str(pd.Timestamp(x))
+            else:
+                x_text = "{:.6g}".format(x)
+            text = "X Value: {} | Y Value: {:.6g}".format(x_text, y)
+            if categories is not None:
+                category = categories[row] if labels is None else labels[categories[row]]
+                text = "{} | {}".format(category, text)
+            return text
+
+        def lookup(event) -> None:
+            row = None
+            x_range, y_range = p.x_range, p.y_range
+            if event is not None and None not in (
+                x_range.start,
+                x_range.end,
+                y_range.start,
+                y_range.end,
+            ):
+                x_scale = (p.inner_width or p.plot_width) / ((x_range.end - x_range.start) or 1)
+                y_scale = (p.inner_height or p.plot_height) / ((y_range.end - y_range.start) or 1)
+                row = index.nearest(event.x, event.y, x_scale, y_scale, max_distance)
+            if row is None:
+                overlay.data = dict(x=[], y=[], text=[])
+            else:
+                overlay.data = dict(x=[index.x[row]], y=[index.y[row]], text=[describe(row)])
+
+        trigger = throttle(doc, lookup, throttle_ms)
+        p.on_event(MouseMove, trigger)
+        # Through the throttle as well, so that a pending look-up cannot show the point again
+        p.on_event(MouseLeave, lambda event: trigger(None))
+        return index
+
     @classmethod
     def display_palette(cls) -> None:
         """[Displays the color palette on the terminal, along with hex code]"""